@@ -0,0 +1,273 @@
+"""
+Goal directed point-to-point shortest paths using A* search, landmarks and the triangle inequality (ALT).
+
+A* search is Dijkstra's algorithm where the queue is ordered by d(s, v) + h(v) instead of d(s, v), with
+h(v) being a lower bound of the distance from v to the target t. Vertices that lead away from the target
+get large keys and are settled late, or never, so far fewer vertices are explored than with Dijkstra's
+algorithm. As long as h never overestimates and h(u) <= w(u, v) + h(v) holds for every edge (u, v), the
+distance of a vertex is final once it is removed from the queue, exactly as in Dijkstra's algorithm.
+
+The lower bounds are obtained from a small set of landmark vertices L for which the distances from and to
+every other vertex are precomputed. By the triangle inequality:
+
+    d(v, t) >= d(L, t) - d(L, v)
+    d(v, t) >= d(v, L) - d(t, L)
+
+and h(v) is the largest of these bounds over all the landmarks. Landmarks are picked with the farthest
+heuristic: each new landmark is the vertex furthest away from the ones already picked, which places them
+near the border of the graph where they give the tightest bounds.
+
+The preprocessing runs a Dijkstra search from each landmark on the graph and on its reverse, and
+stores the 2 * k * V distances in two flat arrays in vertex major order, so the bounds of a vertex for all
+the landmarks are adjacent in memory.
+"""
+
+from array import array
+import random
+import struct
+import sys
+
+import priority_queue
+from dijkstra import DijkstraSolver, INFINITY
+
+
+class LandmarkIndex:
+    MAGIC = b'ALTI'
+    HEADER = struct.Struct('<4sqq')
+
+    def __init__(self, num_vertex, landmarks, from_landmark, to_landmark):
+        self.num_vertex = num_vertex
+        self.landmarks = landmarks
+
+        # from_landmark[v * k + i] = d(L_i, v), to_landmark[v * k + i] = d(v, L_i)
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+
+    @staticmethod
+    def build(graph, num_landmarks=8, seed=None, reverse_graph=None):
+        if reverse_graph is None:
+            reverse_graph = graph.reverse()
+
+        n = graph.V()
+        k = min(num_landmarks, n)
+        forward_solver = DijkstraSolver(graph)
+        backward_solver = DijkstraSolver(reverse_graph)
+        index = LandmarkIndex(n, [], array('d', [INFINITY]) * (n * k), array('d', [INFINITY]) * (n * k))
+
+        # the distance of each vertex to its closest landmark, used to pick the next landmark
+        closest = [INFINITY for _ in range(n)]
+        landmark = random.Random(seed).randrange(n)
+
+        for i in range(k):
+            index.landmarks.append(landmark)
+            forward_solver.query(landmark)
+            backward_solver.query(landmark)
+            forward = forward_solver.distances
+            backward = backward_solver.distances
+
+            for v in range(n):
+                index.from_landmark[v * k + i] = forward[v]
+                index.to_landmark[v * k + i] = backward[v]
+
+                d = min(forward[v], backward[v])
+                if d < closest[v]:
+                    closest[v] = d
+
+            # the farthest vertex that is still connected to one of the landmarks
+            candidates = [v for v in range(n) if closest[v] != INFINITY]
+            landmark = max(candidates, key=lambda v: closest[v])
+
+        return index
+
+    def num_landmarks(self):
+        return len(self.landmarks)
+
+    def target_bounds(self, t):
+        """
+        Returns the distances d(L, t) and d(t, L) for all landmarks, the part of the lower bound
+        that depends only on the target.
+        """
+        k = len(self.landmarks)
+        return self.from_landmark[t * k:(t + 1) * k].tolist(), self.to_landmark[t * k:(t + 1) * k].tolist()
+
+    def lower_bound(self, v, target_bounds):
+        from_t, to_t = target_bounds
+        k = len(self.landmarks)
+        base = v * k
+        bound = 0
+        for i in range(k):
+            from_v = self.from_landmark[base + i]
+            to_v = self.to_landmark[base + i]
+
+            # a bound involving an infinite distance carries no information
+            if from_t[i] != INFINITY and from_v != INFINITY and from_t[i] - from_v > bound:
+                bound = from_t[i] - from_v
+            if to_t[i] != INFINITY:
+                # t reaches the landmark but v does not, so v cannot reach t either
+                if to_v == INFINITY:
+                    return INFINITY
+                if to_v - to_t[i] > bound:
+                    bound = to_v - to_t[i]
+        return bound
+
+    def save(self, path):
+        """
+        Writes the index as the header followed by the landmarks as little-endian int32 and the
+        two distance arrays as little-endian float64, like the graph snapshots.
+        """
+        arrays = [array('i', self.landmarks), array('d', self.from_landmark), array('d', self.to_landmark)]
+        if sys.byteorder == 'big':
+            for a in arrays:
+                a.byteswap()
+
+        with open(path, 'wb') as f:
+            f.write(LandmarkIndex.HEADER.pack(LandmarkIndex.MAGIC, self.num_vertex, len(self.landmarks)))
+            for a in arrays:
+                f.write(a.tobytes() if hasattr(a, 'tobytes') else a.tostring())
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            magic, n, k = LandmarkIndex.HEADER.unpack(f.read(LandmarkIndex.HEADER.size))
+            if magic != LandmarkIndex.MAGIC:
+                raise ValueError("%s is not a landmark index" % path)
+
+            arrays = []
+            for (code, count) in (('i', k), ('d', n * k), ('d', n * k)):
+                a = array(code)
+                a.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                arrays.append(a)
+
+        landmarks, from_landmark, to_landmark = arrays
+        return LandmarkIndex(n, landmarks.tolist(), from_landmark, to_landmark)
+
+
+class ALTShortestPath:
+    """
+    Answers point-to-point queries with A* search guided by a LandmarkIndex. Like DijkstraSolver
+    it keeps its queue between queries, so a query costs time proportional to the vertices it explores.
+    """
+    def __init__(self, graph, index):
+        assert graph.V() == index.num_vertex
+
+        self.graph = graph
+        self.index = index
+        self.queue = priority_queue.IndexedPriorityQueue(graph.V())
+
+        self.source = None
+        self.distances = {}
+        self.parent_chain = {}
+        self.num_settled = 0
+
+    def query(self, source, target):
+        self.queue.clear()
+        self.source = source
+        self.distances = {source: 0}
+        self.parent_chain = {source: None}
+        self.num_settled = 0
+
+        # vertices removed from the queue, they are only reopened if rounding makes the bounds inconsistent
+        closed = set()
+
+        index = self.index
+        target_bounds = index.target_bounds(target)
+        distances = self.distances
+        parent_chain = self.parent_chain
+        queue = self.queue
+
+        # the lower bounds are computed once per vertex
+        bounds = {source: index.lower_bound(source, target_bounds)}
+        queue.insert(source, bounds[source])
+
+        while not queue.is_empty():
+            v = queue.del_min()[0]
+            closed.add(v)
+            self.num_settled += 1
+            if v == target:
+                return distances[target]
+
+            d = distances[v]
+            for (vtx, weight) in self.graph.edges(v):
+                if vtx not in distances:
+                    bounds[vtx] = index.lower_bound(vtx, target_bounds)
+                    distances[vtx] = d + weight
+                    parent_chain[vtx] = v
+                    queue.insert(vtx, d + weight + bounds[vtx])
+                elif distances[vtx] > d + weight:
+                    distances[vtx] = d + weight
+                    parent_chain[vtx] = v
+                    if vtx in closed:
+                        closed.remove(vtx)
+                        queue.insert(vtx, d + weight + bounds[vtx])
+                    else:
+                        queue.decrease(vtx, d + weight + bounds[vtx])
+
+        return INFINITY
+
+    def distance(self, v):
+        return self.distances.get(v, INFINITY)
+
+    def path_to(self, v):
+        if v not in self.parent_chain:
+            return None
+
+        path = [v]
+        while self.parent_chain[v] is not None:
+            v = self.parent_chain[v]
+            path.append(v)
+        path.reverse()
+        return path
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import timeit
+
+    import graph_utils
+
+    g = graph_utils.WeightedDigraph(5)
+    g.add_weighted_edge(0, 1, 1)
+    g.add_weighted_edge(0, 2, 2)
+    g.add_weighted_edge(2, 3, 1)
+    g.add_weighted_edge(1, 3, 1)
+    g.add_weighted_edge(3, 4, 4)
+    g.add_weighted_edge(2, 4, 2)
+
+    alt = ALTShortestPath(g, LandmarkIndex.build(g, 2, seed=1))
+    assert alt.query(0, 4) == 4 and alt.path_to(4) == [0, 2, 4]
+    assert alt.query(4, 0) == INFINITY
+
+    graph = graph_utils.random_weighted_digraph(20000, 60000, seed=1)
+
+    start = timeit.default_timer()
+    index = LandmarkIndex.build(graph, 8, seed=1)
+    print('preprocessing %d landmarks: %.2fs' % (index.num_landmarks(), timeit.default_timer() - start))
+
+    path = os.path.join(tempfile.mkdtemp(), 'landmarks.bin')
+    index.save(path)
+    index = LandmarkIndex.load(path)
+    os.remove(path)
+
+    rnd = random.Random(7)
+    queries = [(rnd.randrange(graph.V()), rnd.randrange(graph.V())) for _ in range(50)]
+
+    dijkstra = DijkstraSolver(graph)
+    alt = ALTShortestPath(graph, index)
+    times = [0.0, 0.0]
+    settled = [0, 0]
+    for (s, t) in queries:
+        start = timeit.default_timer()
+        expected = dijkstra.query(s, target=t)
+        times[0] += timeit.default_timer() - start
+        settled[0] += dijkstra.num_settled
+
+        start = timeit.default_timer()
+        assert alt.query(s, t) == expected
+        times[1] += timeit.default_timer() - start
+        settled[1] += alt.num_settled
+
+    for name, t, n in zip(('dijkstra', 'alt'), times, settled):
+        print('%s: %.3f ms/query, %d settled/query' % (name, 1000 * t / len(queries), n / len(queries)))
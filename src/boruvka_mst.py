@@ -0,0 +1,175 @@
+"""
+Boruvka's algorithm for the minimum spanning tree, with the edge scans spread over a pool of processes.
+
+The algorithm grows all the components of the forest at the same time:
+
+    Boruvka-MST(G)
+        Start with every vertex in its own component.
+        While there is more than one component and an edge between two of them
+            For each component, find the cheapest edge leaving it
+            Add all these edges to the tree and merge the components they connect
+
+Every round at least halves the number of components, so there are at most logV rounds of O(E)
+work each. The cheapest edge of a component is only well defined if the edges are totally ordered,
+so ties between equal weights are broken by the position of the edge, which also guarantees that
+the edges chosen in a round never form a cycle.
+
+The search for the cheapest edges is what parallelises. The edges are kept once in shared memory,
+as arrays of endpoints and weights, along with the component label of every vertex. Every round the
+edge array is cut into chunks and each worker process returns the cheapest edge per component that
+it found in its chunks, the driver keeps the best per component, merges the components with a
+UnionFind and publishes the new labels for the next round.
+
+The weight is the sum of the tree edges in ascending order, the order in which KruskalMST adds them,
+so that the floating point result is identical.
+"""
+
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+import graph_utils
+from union_find import UnionFind
+
+# the shared arrays of each worker process: endpoints, weights and component labels
+_shared = None
+
+
+def _init_worker(us, vs, ws, labels):
+    global _shared
+    _shared = (us, vs, ws, labels)
+
+
+def _cheapest(bounds, arrays=None):
+    """
+    Returns the cheapest edge leaving each component among the edges in [start, end), as a dict
+    from component labels to (weight, edge position) pairs.
+    """
+    start, end = bounds
+    us, vs, ws, labels = arrays if arrays is not None else _shared
+    best = {}
+    for i in range(start, end):
+        cu = labels[us[i]]
+        cv = labels[vs[i]]
+        if cu != cv:
+            candidate = (ws[i], i)
+            if cu not in best or candidate < best[cu]:
+                best[cu] = candidate
+            if cv not in best or candidate < best[cv]:
+                best[cv] = candidate
+    return best
+
+
+class BoruvkaMST:
+    def __init__(self, graph, workers=None, chunk_size=65536):
+        # the edges are taken once, in the direction u < v, from graphs that store both directions
+        if graph_utils.is_directed(graph):
+            raise ValueError("a minimum spanning tree requires an undirected graph")
+
+        self.graph = graph
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.w = 0
+        self.mst = []
+
+        # the number of rounds, each one scans all the edges
+        self.num_rounds = 0
+
+        edges = [(u, v, w) for u in range(graph.V()) for (v, w) in graph.edges(u) if u < v]
+        self.num_edges = len(edges)
+        self.us = RawArray('i', [u for (u, _, _) in edges])
+        self.vs = RawArray('i', [v for (_, v, _) in edges])
+        self.ws = RawArray('d', [w for (_, _, w) in edges])
+        self.labels = RawArray('i', range(graph.V()))
+
+        self.__mst()
+
+    def __mst(self):
+        arrays = (self.us, self.vs, self.ws, self.labels)
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, _init_worker, arrays)
+
+        try:
+            uf = UnionFind(self.graph.V())
+            weights = []
+            while True:
+                chunks = [(start, min(start + self.chunk_size, self.num_edges))
+                          for start in range(0, self.num_edges, self.chunk_size)]
+                if pool is not None:
+                    results = pool.map(_cheapest, chunks)
+                else:
+                    results = [_cheapest(chunk, arrays) for chunk in chunks]
+
+                best = {}
+                for result in results:
+                    for (component, candidate) in result.items():
+                        if component not in best or candidate < best[component]:
+                            best[component] = candidate
+
+                if not best:
+                    break
+                self.num_rounds += 1
+
+                for (w, i) in set(best.values()):
+                    u, v = self.us[i], self.vs[i]
+                    if not uf.connected(u, v):
+                        uf.union(u, v)
+                        self.mst.append((u, v))
+                        weights.append(w)
+
+                labels = self.labels
+                for v in range(self.graph.V()):
+                    labels[v] = uf.find(v)
+
+            for w in sorted(weights):
+                self.w += w
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def weight(self):
+        return self.w
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+
+    from kruskal_mst import KruskalMST
+
+    for (path, zero_based) in (('../data/tinyEWG.txt', True), ('../data/mediumEWG.txt', True),
+                               ('../data/clustering1.txt', False)):
+        graph = graph_utils.load_weighted_graph(path, zero_based)
+        expected = KruskalMST(graph).weight()
+        for workers in (1, 2):
+            mst = BoruvkaMST(graph, workers=workers, chunk_size=1000)
+            assert mst.weight() == expected and len(mst.mst) == graph.V() - 1
+
+    digraph = graph_utils.WeightedDigraph(3)
+    digraph.add_weighted_edges([0, 1, 2], [1, 2, 0], [1.0, 2.0, 3.0])
+    try:
+        BoruvkaMST(digraph, workers=1)
+        assert False
+    except ValueError:
+        pass
+
+    # a large random graph, with a spanning path to keep it connected
+    n = 50000
+    rnd = random.Random(1)
+    us = list(range(n - 1)) + [rnd.randrange(n) for _ in range(400000)]
+    vs = list(range(1, n)) + [rnd.randrange(n) for _ in range(400000)]
+    graph = graph_utils.WeightedGraph(n)
+    graph.add_weighted_edges(us, vs, [rnd.random() for _ in range(len(us))])
+
+    start = timeit.default_timer()
+    expected = KruskalMST(graph).weight()
+    print('kruskal: %.2fs' % (timeit.default_timer() - start))
+
+    for workers in (1, 2, 4):
+        start = timeit.default_timer()
+        mst = BoruvkaMST(graph, workers=workers)
+        elapsed = timeit.default_timer() - start
+        assert mst.weight() == expected
+        print('boruvka, %d workers: %.2fs, %d rounds, %d cores'
+              % (workers, elapsed, mst.num_rounds, multiprocessing.cpu_count()))
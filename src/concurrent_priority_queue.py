@@ -0,0 +1,367 @@
+"""
+Priority queues that can be shared by threads or by asyncio coroutines, for scheduling jobs.
+
+Each variant exists for items and for integer indexes:
+
+    -ThreadSafePriorityQueue and ThreadSafeIndexedPriorityQueue block the calling thread in get until
+     an item is available, or until the timeout expires.
+    -AsyncPriorityQueue and AsyncIndexedPriorityQueue return a future from get which the coroutine
+     awaits, they must only be used from the thread running the event loop. They need asyncio and
+     therefore Python 3.
+
+All of them offer put, get, get_nowait and decrease, which lowers the priority of a queued item and
+has no effect if the item is no longer queued or already has a lower priority.
+
+These queues are separate from PriorityQueue and IndexedPriorityQueue of priority_queue and do not
+build on them. Their heap is a list managed by heapq, the binary heap of the standard library, which
+is written in C like the one behind Queue.PriorityQueue. The pure Python heaps of priority_queue cost
+several times more per removal and made the queues slower than the standard library. An item is queued as the
+entry (priority, sequence number, item), so that items are never compared, and a decrease queues the
+item again under a smaller priority. The entry left behind is stale and skipped when it reaches the
+head of the heap. The indexed queues are the same with the indexes as items. Their put and decrease
+check the index in the calling thread and raise IndexError there, so that a batch of pending
+operations never fails halfway in the get of another thread.
+
+Contention between the threads is kept low by a batched handoff. Producers do not take the lock of
+the heap: put and decrease append the operation to a deque, whose append is atomic, and only take
+the lock to wake a consumer if one is waiting. A consumer takes the lock, applies all the pending
+operations in one batch, re-heapifying at once when the batch is large compared to the heap, and
+removes the head. However many producers there are, the heap is only ever touched by one consumer at
+a time.
+
+    queue = ThreadSafePriorityQueue()
+    queue.put(job, 5)           # in any producer thread
+    queue.decrease(job, 1)
+    job, priority = queue.get() # in any consumer thread
+"""
+
+from collections import deque
+import heapq
+import itertools
+import threading
+import timeit
+
+try:
+    import queue as stdqueue
+except ImportError:
+    import Queue as stdqueue
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# raised by get_nowait, and by get when the timeout expires, like the queues of the standard library
+Empty = stdqueue.Empty
+
+PUT, DECREASE = 0, 1
+
+
+class _ItemHeap:
+    """
+    A heapq heap of arbitrary hashable items with decrease-key by lazy deletion, not thread safe.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()
+
+        # the current priority of each queued item, the entries with another priority are stale
+        self.current = {}
+
+    def apply(self, ops):
+        current = self.current
+        entries = []
+        for (op, item, priority) in ops:
+            if op == DECREASE and not (item in current and priority < current[item]):
+                continue
+            current[item] = priority
+            entries.append((priority, next(self.sequence), item))
+
+        heap = self.heap
+        if len(entries) > len(heap):
+            heap.extend(entries)
+            heapq.heapify(heap)
+        else:
+            for entry in entries:
+                heapq.heappush(heap, entry)
+
+    def pop(self):
+        heap, current = self.heap, self.current
+        while heap:
+            priority, _, item = heapq.heappop(heap)
+            if current.get(item) == priority:
+                del current[item]
+                return item, priority
+        raise Empty
+
+    def size(self):
+        return len(self.current)
+
+
+class _IndexHeap(_ItemHeap):
+    """
+    An _ItemHeap of the integer indexes 0 to maxItems - 1, not thread safe.
+    """
+
+    def __init__(self, maxItems):
+        _ItemHeap.__init__(self)
+        self.maxItems = maxItems
+
+    def check(self, index):
+        if not 0 <= index < self.maxItems:
+            raise IndexError("index %d out of range" % index)
+
+
+class _ThreadSafeQueue:
+    def __init__(self, heap):
+        self._heap = heap
+        self._incoming = deque()
+        self._cond = threading.Condition(threading.Lock())
+
+        # the number of consumers blocked in get, producers only take the lock when it is not zero
+        self._waiting = 0
+
+    def _handoff(self, op):
+        self._incoming.append(op)
+        if self._waiting:
+            with self._cond:
+                self._cond.notify()
+
+    def _drain(self):
+        incoming = self._incoming
+        if incoming:
+            ops = []
+            while incoming:
+                ops.append(incoming.popleft())
+            self._heap.apply(ops)
+
+    def get(self, block=True, timeout=None):
+        """
+        Removes and returns the (item, priority) pair of smallest priority. Waits for an item if the
+        queue is empty, up to timeout seconds if given, and raises Empty if none arrives.
+        """
+        heap = self._heap
+        with self._cond:
+            self._drain()
+            if heap.size() > 0:
+                return heap.pop()
+            if not block:
+                raise Empty
+
+            deadline = timeit.default_timer() + timeout if timeout is not None else None
+            # registered before looking at the pending operations again, so that a producer either
+            # sees the consumer waiting or appended its operation before the second look
+            self._waiting += 1
+            try:
+                while True:
+                    self._drain()
+                    if heap.size() > 0:
+                        return heap.pop()
+                    if deadline is None:
+                        self._cond.wait()
+                    else:
+                        remaining = deadline - timeit.default_timer()
+                        if remaining <= 0:
+                            raise Empty
+                        self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def size(self):
+        with self._cond:
+            self._drain()
+            return self._heap.size()
+
+    def is_empty(self):
+        return self.size() == 0
+
+
+class ThreadSafePriorityQueue(_ThreadSafeQueue):
+    def __init__(self):
+        _ThreadSafeQueue.__init__(self, _ItemHeap())
+
+    def put(self, item, priority):
+        """
+        Queues the item with the given priority, or gives a queued item the new priority.
+        """
+        self._handoff((PUT, item, priority))
+
+    def decrease(self, item, priority):
+        self._handoff((DECREASE, item, priority))
+
+
+class ThreadSafeIndexedPriorityQueue(_ThreadSafeQueue):
+    def __init__(self, maxItems):
+        _ThreadSafeQueue.__init__(self, _IndexHeap(maxItems))
+
+    def put(self, index, key):
+        self._heap.check(index)
+        self._handoff((PUT, index, key))
+
+    def decrease(self, index, key):
+        self._heap.check(index)
+        self._handoff((DECREASE, index, key))
+
+
+class _AsyncQueue:
+    def __init__(self, heap):
+        if asyncio is None:
+            raise RuntimeError("the asyncio queues require Python 3")
+        self._heap = heap
+
+        # the futures of the coroutines waiting in get, in arrival order
+        self._getters = deque()
+
+    def _apply(self, op):
+        self._heap.apply([op])
+        while self._getters and self._heap.size() > 0:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(self._heap.pop())
+
+    def get(self):
+        """
+        Returns a future of the (item, priority) pair of smallest priority, to be awaited.
+        """
+        getter = asyncio.get_event_loop().create_future()
+        if self._heap.size() > 0 and not self._getters:
+            getter.set_result(self._heap.pop())
+        else:
+            self._getters.append(getter)
+        return getter
+
+    def get_nowait(self):
+        return self._heap.pop()
+
+    def size(self):
+        return self._heap.size()
+
+    def is_empty(self):
+        return self.size() == 0
+
+
+class AsyncPriorityQueue(_AsyncQueue):
+    def __init__(self):
+        _AsyncQueue.__init__(self, _ItemHeap())
+
+    def put(self, item, priority):
+        self._apply((PUT, item, priority))
+
+    def decrease(self, item, priority):
+        self._apply((DECREASE, item, priority))
+
+
+class AsyncIndexedPriorityQueue(_AsyncQueue):
+    def __init__(self, maxItems):
+        _AsyncQueue.__init__(self, _IndexHeap(maxItems))
+
+    def put(self, index, key):
+        self._heap.check(index)
+        self._apply((PUT, index, key))
+
+    def decrease(self, index, key):
+        self._heap.check(index)
+        self._apply((DECREASE, index, key))
+
+
+if __name__ == "__main__":
+    import random
+
+    queue = ThreadSafePriorityQueue()
+    for (job, priority) in (("a", 5), ("b", 3), ("c", 4)):
+        queue.put(job, priority)
+    queue.decrease("a", 1)
+    queue.decrease("b", 10)
+    assert queue.size() == 3
+    assert [queue.get_nowait() for _ in range(3)] == [("a", 1), ("b", 3), ("c", 4)]
+    try:
+        queue.get(timeout=0.01)
+        assert False
+    except Empty:
+        pass
+
+    indexed = ThreadSafeIndexedPriorityQueue(10)
+    indexed.put(3, 2.0)
+    indexed.put(7, 1.5)
+    indexed.decrease(3, 1.0)
+    assert indexed.get() == (3, 1.0) and indexed.get() == (7, 1.5)
+
+    # an index out of range is rejected by the producer and the pending operations survive it
+    indexed.put(2, 4.0)
+    for bad in (-1, 10):
+        try:
+            indexed.put(bad, 0.5)
+            assert False
+        except IndexError:
+            pass
+    assert indexed.get() == (2, 4.0) and indexed.is_empty()
+
+    # many producers and consumers, against the locked queue of the standard library
+    def run(queue, put, job_of, num_producers, num_consumers, per_producer):
+        received = []
+
+        def produce(p):
+            rnd = random.Random(p)
+            for i in range(per_producer):
+                put(queue, (p, i), rnd.random())
+
+        def consume():
+            while True:
+                job = job_of(queue.get())
+                if job[0] is None:
+                    return
+                received.append(job)
+
+        start = timeit.default_timer()
+        consumers = [threading.Thread(target=consume) for _ in range(num_consumers)]
+        producers = [threading.Thread(target=produce, args=(p,)) for p in range(num_producers)]
+        for t in consumers + producers:
+            t.start()
+        for t in producers:
+            t.join()
+        # the stop jobs are distinct and rank after all the others
+        for c in range(num_consumers):
+            put(queue, (None, c), 2.0)
+        for t in consumers:
+            t.join()
+        elapsed = timeit.default_timer() - start
+
+        assert sorted(received) == sorted((p, i) for p in range(num_producers) for i in range(per_producer))
+        return len(received) / elapsed
+
+    def put_handoff(queue, job, priority):
+        queue.put(job, priority)
+
+    def put_stdlib(queue, job, priority):
+        queue.put((priority, job))
+
+    for (producers, consumers) in ((1, 1), (8, 2), (32, 4)):
+        per_producer = 40000 // producers
+        handoff = run(ThreadSafePriorityQueue(), put_handoff, lambda pair: pair[0],
+                      producers, consumers, per_producer)
+        locked = run(stdqueue.PriorityQueue(), put_stdlib, lambda pair: pair[1],
+                     producers, consumers, per_producer)
+        print('%d producers, %d consumers: %.0f items/s batched handoff, %.0f items/s Queue.PriorityQueue'
+              % (producers, consumers, handoff, locked))
+
+    if asyncio is not None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async_queue = AsyncPriorityQueue()
+        for (job, priority) in (("x", 3), ("y", 2), ("z", 5)):
+            async_queue.put(job, priority)
+        async_queue.decrease("z", 1)
+        ready = [async_queue.get() for _ in range(3)]
+
+        # a get on an empty queue is resolved by the next put
+        waiting = async_queue.get()
+        loop.call_soon(async_queue.put, "w", 4)
+
+        results = loop.run_until_complete(asyncio.gather(*(ready + [waiting])))
+        assert results == [("z", 1), ("y", 2), ("x", 3), ("w", 4)]
+        loop.close()
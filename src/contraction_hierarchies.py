@@ -0,0 +1,442 @@
+"""
+Contraction hierarchies for fast point-to-point shortest path queries on weighted digraphs.
+
+The preprocessing orders the vertices by importance and contracts them one by one, from the least to
+the most important. Contracting a vertex v removes it from the graph. Shortest paths that pass through
+v must survive, so for every pair of edges u -> v and v -> w a shortcut edge u -> w of weight
+w(u, v) + w(v, w) is added, unless a witness path u -> w that avoids v and is no longer than the
+shortcut exists. Witnesses are looked for with a Dijkstra search from u that gives up after settling
+a fixed number of vertices; if the search gives up the shortcut is added, which is always correct. The
+priorities only estimate the number of shortcuts, so they use a smaller limit.
+
+The order is computed with a priority queue. The priority of a vertex is its edge
+difference, the number of shortcuts its contraction would add minus the number of edges it would
+remove, plus the number of its neighbours that were already contracted to spread the contractions
+evenly over the graph. Contracting a vertex only changes the priorities of its neighbours, which are
+recomputed after each contraction.
+
+Once all vertices are contracted every edge, original or shortcut, leads either to a higher or to a
+lower ranked vertex. The edges leading upwards form the upward graph, the edges leading downwards are
+reversed and form the downward graph. Every shortest path s -> t has a version in the augmented graph
+which first climbs from s and then descends towards t, so a query runs a Dijkstra search from s on the
+upward graph and one from t on the downward graph. Both searches only climb the hierarchy and explore a
+few hundred vertices even on large graphs. The distance is the minimum over the vertices settled by
+both searches of the sum of their distances.
+
+Each shortcut remembers the vertex it bypasses, so a path in the augmented graph is unpacked into the
+original edges by recursively replacing each shortcut u -> w through v with the edges u -> v and v -> w.
+The bypassed vertices are kept in an array parallel to the targets of the search graphs, and the edge
+u -> w is found by a binary search among the sorted targets of u in the upward graph, or of w in the
+downward graph.
+
+Saved hierarchies store the arrays as little-endian int64 offsets, int32 ranks, targets and middle
+vertices and float64 weights, like the graph snapshots.
+"""
+
+from array import array
+import bisect
+import struct
+import sys
+
+import priority_queue
+from dijkstra import INFINITY
+from graph_snapshot import int64_from_file, int64_to_bytes
+
+NO_MIDDLE = -1
+
+# the typecode of the offsets in memory, they are stored as int64 in the saved files
+OFFSET_CODE = 'l'
+
+
+class ContractionHierarchy:
+    MAGIC = b'CHIX'
+    HEADER = struct.Struct('<4sqqq')
+
+    # the typecodes of the offsets, targets, weights and middles of a search graph
+    GRAPH_CODES = (OFFSET_CODE, 'i', 'd', 'i')
+
+    def __init__(self, num_vertex, rank, up, down):
+        self.num_vertex = num_vertex
+
+        # rank[v] is the position of v in the contraction order
+        self.rank = rank
+
+        # the upward and downward search graphs, as (offsets, targets, weights, middles) arrays, the
+        # middles being the vertices bypassed by the shortcuts and NO_MIDDLE for original edges
+        self.up = up
+        self.down = down
+
+    @staticmethod
+    def build(graph, witness_limit=50, priority_witness_limit=10):
+        """
+        Contracts the graph. The witness limits bound the number of vertices settled by each
+        witness search, during the contraction and when estimating the priorities respectively.
+        """
+        return _Contraction(graph, witness_limit, priority_witness_limit).hierarchy()
+
+    def save(self, path):
+        codes = ('i',) + ContractionHierarchy.GRAPH_CODES + ContractionHierarchy.GRAPH_CODES
+
+        with open(path, 'wb') as f:
+            f.write(ContractionHierarchy.HEADER.pack(ContractionHierarchy.MAGIC, self.num_vertex,
+                                                     len(self.up[1]), len(self.down[1])))
+            for (code, values) in zip(codes, (self.rank,) + self.up + self.down):
+                if code == OFFSET_CODE:
+                    f.write(int64_to_bytes(values))
+                    continue
+                a = array(code, values)
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                f.write(a.tobytes() if hasattr(a, 'tobytes') else a.tostring())
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            magic, n, num_up, num_down = ContractionHierarchy.HEADER.unpack(f.read(ContractionHierarchy.HEADER.size))
+            if magic != ContractionHierarchy.MAGIC:
+                raise ValueError("%s is not a contraction hierarchy" % path)
+
+            def read(typecode, count):
+                if typecode == OFFSET_CODE:
+                    return int64_from_file(f, count)
+                a = array(typecode)
+                a.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                return a
+
+            def read_graph(num_edges):
+                counts = (n + 1, num_edges, num_edges, num_edges)
+                return tuple(read(code, count) for (code, count) in zip(ContractionHierarchy.GRAPH_CODES, counts))
+
+            rank = read('i', n)
+            up = read_graph(num_up)
+            down = read_graph(num_down)
+        return ContractionHierarchy(n, rank, up, down)
+
+    def num_shortcuts(self):
+        return sum(1 for graph in (self.up, self.down) for m in graph[3] if m != NO_MIDDLE)
+
+    def _middle(self, u, w):
+        """
+        Returns the vertex bypassed by the edge u -> w of the augmented graph.
+        """
+        if self.rank[u] < self.rank[w]:
+            (offsets, targets, _, middles), v, target = self.up, u, w
+        else:
+            (offsets, targets, _, middles), v, target = self.down, w, u
+
+        i = bisect.bisect_left(targets, target, offsets[v], offsets[v + 1])
+        assert i < offsets[v + 1] and targets[i] == target
+        return middles[i]
+
+    def unpack(self, u, w):
+        """
+        Returns the original edges, as a list of vertices, replaced by the edge u -> w of the augmented graph.
+        """
+        path = [u]
+        stack = [(u, w)]
+        while stack:
+            a, b = stack.pop()
+            m = self._middle(a, b)
+            if m == NO_MIDDLE:
+                path.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+        return path
+
+
+class _Contraction:
+    """
+    The state of the preprocessing, i.e. the remaining graph and the contraction order.
+    """
+    def __init__(self, graph, witness_limit, priority_witness_limit):
+        n = graph.V()
+        self.n = n
+        self.witness_limit = witness_limit
+        self.priority_witness_limit = priority_witness_limit
+
+        # the remaining graph, including shortcuts, keeping the lightest of any parallel edges
+        self.out_edges = [{} for _ in range(n)]
+        self.in_edges = [{} for _ in range(n)]
+        self.middles = {}
+        for v in range(n):
+            for (w, weight) in graph.edges(v):
+                if w != v and weight < self.out_edges[v].get(w, INFINITY):
+                    self.out_edges[v][w] = weight
+                    self.in_edges[w][v] = weight
+                    self.middles[(v, w)] = NO_MIDDLE
+
+        self.contracted_neighbours = [0 for _ in range(n)]
+        self.rank = array('i', [0]) * n
+
+        # a reusable queue for the witness searches
+        self.witness_queue = priority_queue.IndexedPriorityQueue(n)
+
+        # all edges ever present, the graph shrinks as vertices are contracted
+        self.all_edges = dict(((v, w), weight) for v in range(n) for (w, weight) in self.out_edges[v].items())
+
+        self._contract_all()
+
+    def _witness_distances(self, source, excluded, targets, max_distance, limit):
+        queue = self.witness_queue
+        queue.clear()
+        distances = {source: 0}
+        queue.insert(source, 0)
+        settled = 0
+
+        # the search is over once all the targets are settled
+        remaining = len(targets)
+
+        while not queue.is_empty() and settled < limit and remaining > 0:
+            v, d = queue.del_min()
+            if d > max_distance:
+                break
+            settled += 1
+            if v in targets:
+                remaining -= 1
+
+            for (w, weight) in self.out_edges[v].items():
+                if w == excluded:
+                    continue
+                if d + weight < distances.get(w, INFINITY):
+                    # a reached vertex whose distance drops has not been settled yet
+                    if w in distances:
+                        queue.decrease(w, d + weight)
+                    else:
+                        queue.insert(w, d + weight)
+                    distances[w] = d + weight
+        return distances
+
+    def _shortcuts(self, v, limit):
+        shortcuts = []
+        out_v = self.out_edges[v]
+        if not out_v:
+            return shortcuts
+
+        max_out = max(out_v.values())
+        for (u, w_uv) in self.in_edges[v].items():
+            distances = self._witness_distances(u, v, out_v, w_uv + max_out, limit)
+            for (w, w_vw) in out_v.items():
+                if w != u and distances.get(w, INFINITY) > w_uv + w_vw:
+                    shortcuts.append((u, w, w_uv + w_vw))
+        return shortcuts
+
+    def _priority(self, v):
+        removed = len(self.in_edges[v]) + len(self.out_edges[v])
+        return len(self._shortcuts(v, self.priority_witness_limit)) - removed + self.contracted_neighbours[v]
+
+    def _contract_all(self):
+        queue = priority_queue.IndexedPriorityQueue(self.n)
+        for v in range(self.n):
+            queue.insert(v, self._priority(v))
+
+        order = 0
+        while not queue.is_empty():
+            v = queue.del_min()[0]
+            neighbours = set(self.in_edges[v]) | set(self.out_edges[v])
+
+            self._contract(v)
+            self.rank[v] = order
+            order += 1
+
+            # only the priorities of the neighbours are affected by the contraction
+            for u in neighbours:
+                queue.insert(u, self._priority(u))
+
+    def _contract(self, v):
+        for (u, w, weight) in self._shortcuts(v, self.witness_limit):
+            if weight < self.out_edges[u].get(w, INFINITY):
+                self.out_edges[u][w] = weight
+                self.in_edges[w][u] = weight
+                self.middles[(u, w)] = v
+                self.all_edges[(u, w)] = weight
+
+        for u in self.in_edges[v]:
+            del self.out_edges[u][v]
+            self.contracted_neighbours[u] += 1
+        for w in self.out_edges[v]:
+            del self.in_edges[w][v]
+            self.contracted_neighbours[w] += 1
+
+        self.in_edges[v] = {}
+        self.out_edges[v] = {}
+
+    def hierarchy(self):
+        up_edges = []
+        down_edges = []
+        for ((u, w), weight) in self.all_edges.items():
+            if self.rank[u] < self.rank[w]:
+                up_edges.append((u, w, weight, self.middles[(u, w)]))
+            else:
+                down_edges.append((w, u, weight, self.middles[(u, w)]))
+        return ContractionHierarchy(self.n, self.rank, _search_graph(self.n, up_edges),
+                                    _search_graph(self.n, down_edges))
+
+
+def _search_graph(n, edges):
+    edges.sort()
+    offsets = array(OFFSET_CODE, [0]) * (n + 1)
+    for e in edges:
+        offsets[e[0] + 1] += 1
+    for v in range(n):
+        offsets[v + 1] += offsets[v]
+
+    return (offsets, array('i', [e[1] for e in edges]), array('d', [e[2] for e in edges]),
+            array('i', [e[3] for e in edges]))
+
+
+class CHShortestPath:
+    """
+    Answers distance and path queries on a ContractionHierarchy.
+
+        ch = ContractionHierarchy.build(graph)
+        query = CHShortestPath(ch)
+        query.query(s, t)
+        query.path()
+    """
+    def __init__(self, hierarchy):
+        self.hierarchy = hierarchy
+        n = hierarchy.num_vertex
+        self.queues = (priority_queue.IndexedPriorityQueue(n), priority_queue.IndexedPriorityQueue(n))
+
+        self.mu = INFINITY
+        self.meeting_vertex = None
+        self.distances = ({}, {})
+        self.parents = ({}, {})
+        self.num_settled = 0
+
+    def query(self, source, target):
+        self.mu = INFINITY
+        self.meeting_vertex = None
+        self.distances = ({source: 0}, {target: 0})
+        self.parents = ({source: None}, {target: None})
+        self.num_settled = 0
+
+        graphs = (self.hierarchy.up, self.hierarchy.down)
+        for (queue, vertex) in zip(self.queues, (source, target)):
+            queue.clear()
+            queue.insert(vertex, 0)
+
+        done = [False, False]
+        while not (done[0] and done[1]):
+            side = 0 if (done[1] or (not done[0] and self.queues[0].min_key() <= self.queues[1].min_key())) else 1
+            queue = self.queues[side]
+
+            v, d = queue.del_min()
+            self.num_settled += 1
+
+            other = self.distances[1 - side]
+            if v in other and d + other[v] < self.mu:
+                self.mu = d + other[v]
+                self.meeting_vertex = v
+
+            offsets, targets, weights, _ = graphs[side]
+            distances = self.distances[side]
+            parents = self.parents[side]
+            for i in range(offsets[v], offsets[v + 1]):
+                w, nd = targets[i], d + weights[i]
+                if nd < distances.get(w, INFINITY):
+                    if w in distances:
+                        queue.decrease(w, nd)
+                    else:
+                        queue.insert(w, nd)
+                    distances[w] = nd
+                    parents[w] = v
+
+            # a side stops once its closest queued vertex cannot improve the best distance
+            for s in (0, 1):
+                if self.queues[s].is_empty() or self.queues[s].min_key() >= self.mu:
+                    done[s] = True
+
+        return self.mu
+
+    def distance(self):
+        return self.mu
+
+    def path(self):
+        if self.meeting_vertex is None:
+            return None
+
+        up_chain = []
+        v = self.meeting_vertex
+        while v is not None:
+            up_chain.append(v)
+            v = self.parents[0][v]
+        up_chain.reverse()
+
+        down_chain = []
+        v = self.parents[1][self.meeting_vertex]
+        while v is not None:
+            down_chain.append(v)
+            v = self.parents[1][v]
+
+        chain = up_chain + down_chain
+        path = [chain[0]]
+        for i in range(len(chain) - 1):
+            path.extend(self.hierarchy.unpack(chain[i], chain[i + 1])[1:])
+        return path
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import timeit
+
+    import graph_utils
+    from dijkstra import DijkstraSolver
+
+    def path_weight(graph, path):
+        return sum(min(w for (u, w) in graph.edges(path[i]) if u == path[i + 1]) for i in range(len(path) - 1))
+
+    def check(graph, ch, num_queries):
+        rnd = random.Random(7)
+        dijkstra = DijkstraSolver(graph)
+        query = CHShortestPath(ch)
+        times = [0.0, 0.0]
+
+        for _ in range(num_queries):
+            s, t = rnd.randrange(graph.V()), rnd.randrange(graph.V())
+
+            start = timeit.default_timer()
+            expected = dijkstra.query(s, target=t)
+            times[0] += timeit.default_timer() - start
+
+            start = timeit.default_timer()
+            d = query.query(s, t)
+            times[1] += timeit.default_timer() - start
+
+            assert d == expected
+            if d != INFINITY:
+                path = query.path()
+                assert path[0] == s and path[-1] == t and path_weight(graph, path) == d
+        return times
+
+    g = graph_utils.WeightedDigraph(5)
+    g.add_weighted_edge(0, 1, 1)
+    g.add_weighted_edge(0, 2, 2)
+    g.add_weighted_edge(2, 3, 1)
+    g.add_weighted_edge(1, 3, 1)
+    g.add_weighted_edge(3, 4, 4)
+    g.add_weighted_edge(2, 4, 2)
+    ch = ContractionHierarchy.build(g)
+    query = CHShortestPath(ch)
+    assert query.query(0, 4) == 4 and query.path() == [0, 2, 4]
+    assert query.query(4, 0) == INFINITY and query.path() is None
+    check(g, ch, 25)
+
+    g = graph_utils.grid_weighted_digraph(40, 40, seed=1)
+
+    start = timeit.default_timer()
+    ch = ContractionHierarchy.build(g)
+    print('preprocessing: %.2fs, %d shortcuts' % (timeit.default_timer() - start, ch.num_shortcuts()))
+
+    path = os.path.join(tempfile.mkdtemp(), 'ch.bin')
+    ch.save(path)
+    ch = ContractionHierarchy.load(path)
+    os.remove(path)
+
+    times = check(g, ch, 200)
+    print('dijkstra: %.3f ms/query, ch: %.3f ms/query' % (5 * times[0], 5 * times[1]))
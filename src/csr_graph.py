@@ -0,0 +1,230 @@
+"""
+A compressed sparse row (CSR) representation for the graphs of graph_utils.
+
+The adjacency list graphs keep one python list per vertex and, for the weighted variants, one
+(vertex, weight) tuple per edge. Every edge therefore costs a pointer in a list, a boxed integer
+and, in the weighted case, a tuple and a boxed float, which adds up to tens of bytes per edge.
+
+A CSR graph stores the same adjacency in three flat arrays:
+
+    offsets[v] .. offsets[v + 1]    the range of the edges of vertex v
+    targets[offsets[v]:offsets[v + 1]]    the vertices adjacent to v
+    weights[offsets[v]:offsets[v + 1]]    the weights of these edges (weighted graphs only)
+
+The offsets array has V + 1 entries, the targets and weights arrays have one entry per stored edge.
+Undirected graphs store each edge in both directions, exactly as the adjacency list graphs do.
+
+The graph is frozen, i.e. it is built once from an existing graph and no edges can be added to it
+afterwards. It exposes the same V(), E() and edges(v) interface as the graph_utils classes, so the
+algorithms that only read a graph can run on it unchanged.
+"""
+
+from array import array
+import ctypes
+import sys
+
+import graph_utils
+
+
+def _tolist(a):
+    # the slices of arrays and numpy arrays have tolist, those of the ctypes arrays of a mapped
+    # snapshot are lists already
+    return a.tolist() if hasattr(a, 'tolist') else a
+
+
+class CSRGraph:
+    # typecodes of the offsets, targets and weights arrays
+    OFFSET_TYPE = 'l'
+    TARGET_TYPE = 'i'
+    WEIGHT_TYPE = 'd'
+
+    def __init__(self, num_vertex, num_edges, offsets, targets, weights=None, directed=True):
+        assert len(offsets) == num_vertex + 1
+        assert len(targets) == offsets[num_vertex]
+        assert weights is None or len(weights) == len(targets)
+
+        self._num_vertex = num_vertex
+        self._num_edges = num_edges
+        self._directed = directed
+
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+        # the mapping of the snapshot that the arrays are views of, see graph_snapshot.load_binary
+        self.mapping = None
+
+    @staticmethod
+    def from_graph(graph):
+        """
+        Builds a CSR graph from any of the Graph, Digraph, WeightedGraph and WeightedDigraph classes.
+        """
+        weighted = isinstance(graph, (graph_utils.WeightedGraph, graph_utils.WeightedDigraph))
+        directed = isinstance(graph, (graph_utils.Digraph, graph_utils.WeightedDigraph))
+
+        offsets = array(CSRGraph.OFFSET_TYPE, [0])
+        targets = array(CSRGraph.TARGET_TYPE)
+        weights = array(CSRGraph.WEIGHT_TYPE) if weighted else None
+
+        for v in range(graph.V()):
+            adj = graph.edges(v)
+            if weighted:
+                for (u, w) in adj:
+                    targets.append(u)
+                    weights.append(w)
+            else:
+                targets.extend(adj)
+            offsets.append(len(targets))
+
+        return CSRGraph(graph.V(), graph.E(), offsets, targets, weights, directed)
+
+    @staticmethod
+    def from_edges(num_vertex, edges, weighted=False, directed=True):
+        """
+        Builds a CSR graph from a sequence of (u, v) or (u, v, w) tuples using a counting sort
+        on the source vertices. Undirected edges are stored in both directions.
+        """
+        edges = list(edges)
+        degrees = [0 for _ in range(num_vertex + 1)]
+        for e in edges:
+            degrees[e[0] + 1] += 1
+            if not directed:
+                degrees[e[1] + 1] += 1
+
+        for v in range(num_vertex):
+            degrees[v + 1] += degrees[v]
+
+        num_stored = degrees[num_vertex]
+        offsets = array(CSRGraph.OFFSET_TYPE, degrees)
+        targets = array(CSRGraph.TARGET_TYPE, [0]) * num_stored
+        weights = array(CSRGraph.WEIGHT_TYPE, [0.0]) * num_stored if weighted else None
+
+        # degrees now serves as the insertion cursor of each vertex
+        for e in edges:
+            u, v = e[0], e[1]
+            targets[degrees[u]] = v
+            if weighted:
+                weights[degrees[u]] = e[2]
+            degrees[u] += 1
+
+            if not directed:
+                targets[degrees[v]] = u
+                if weighted:
+                    weights[degrees[v]] = e[2]
+                degrees[v] += 1
+
+        # weighted undirected graphs count each edge twice, like WeightedGraph
+        num_edges = len(edges) if directed or not weighted else 2 * len(edges)
+        return CSRGraph(num_vertex, num_edges, offsets, targets, weights, directed)
+
+    def V(self): return self._num_vertex
+
+    def E(self): return self._num_edges
+
+    def is_weighted(self):
+        return self.weights is not None
+
+    def is_directed(self):
+        return self._directed
+
+    def degree(self, v):
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def edges(self, v):
+        lo, hi = self.offsets[v], self.offsets[v + 1]
+        if self.weights is None:
+            return _tolist(self.targets[lo:hi])
+        return list(zip(_tolist(self.targets[lo:hi]), _tolist(self.weights[lo:hi])))
+
+    def edge_list(self):
+        for v in range(self._num_vertex):
+            for (u, w) in self.edges(v):
+                yield v, u, w
+
+    def reverse(self):
+        assert self._directed
+
+        reversed_edges = []
+        for v in range(self._num_vertex):
+            lo, hi = self.offsets[v], self.offsets[v + 1]
+            for i in range(lo, hi):
+                if self.weights is None:
+                    reversed_edges.append((self.targets[i], v))
+                else:
+                    reversed_edges.append((self.targets[i], v, self.weights[i]))
+
+        return CSRGraph.from_edges(self._num_vertex, reversed_edges, self.weights is not None, True)
+
+    def memory_usage(self):
+        """
+        Returns the number of bytes occupied by the offsets, targets and weights arrays.
+        """
+        total = 0
+        for a in (self.offsets, self.targets, self.weights):
+            if a is not None:
+                total += len(a) * a.itemsize if hasattr(a, 'itemsize') else ctypes.sizeof(a)
+        return total
+
+    def bytes_per_edge(self):
+        return self.memory_usage() / float(max(1, len(self.targets)))
+
+
+def adjacency_memory_usage(graph):
+    """
+    Approximates the number of bytes occupied by the adjacency lists of a graph_utils graph,
+    counting the lists, the tuples and the boxed numbers they reference.
+    """
+    total = sys.getsizeof(graph._vertices)
+    for adj in graph._vertices:
+        total += sys.getsizeof(adj)
+        for e in adj:
+            if type(e) is tuple:
+                total += sys.getsizeof(e) + sum(sys.getsizeof(x) for x in e)
+            else:
+                total += sys.getsizeof(e)
+    return total
+
+
+if __name__ == "__main__":
+    from dijkstra import DijkstraShortestPath
+    from kruskal_mst import KruskalMST
+    from prim_mst import PrimMST
+    from strong_connected_components import SCC
+    from topological_sort import TopologicalSort
+
+    g = graph_utils.load_graph('../data/tinyG.txt')
+    csr = CSRGraph.from_graph(g)
+    assert csr.V() == g.V() and csr.E() == g.E()
+    for v in range(g.V()):
+        assert csr.edges(v) == g.edges(v)
+
+    g = graph_utils.load_digraph('../data/tinyDG.txt')
+    csr = CSRGraph.from_graph(g)
+    assert sorted(SCC(csr).scc()) == sorted(SCC(g).scc())
+    for v in range(g.V()):
+        assert sorted(csr.reverse().edges(v)) == sorted(g.reverse().edges(v))
+
+    g = graph_utils.load_digraph('../data/mediumDG.txt')
+    assert TopologicalSort(CSRGraph.from_graph(g)).topological_sort() == TopologicalSort(g).topological_sort()
+
+    g = graph_utils.load_weighted_graph('../data/mediumEWG.txt')
+    csr = CSRGraph.from_graph(g)
+    assert abs(KruskalMST(csr).weight() - KruskalMST(g).weight()) < 1e-9
+    assert abs(PrimMST(csr).weight() - PrimMST(g).weight()) < 1e-9
+
+    print('adjacency lists: %.1f bytes per edge' % (adjacency_memory_usage(g) / float(g.E())))
+    print('csr: %.1f bytes per edge' % csr.bytes_per_edge())
+
+    g = graph_utils.WeightedDigraph(5)
+    g.add_weighted_edge(0, 1, 1)
+    g.add_weighted_edge(0, 2, 2)
+    g.add_weighted_edge(2, 3, 1)
+    g.add_weighted_edge(1, 3, 1)
+    g.add_weighted_edge(3, 4, 4)
+    g.add_weighted_edge(2, 4, 2)
+
+    csr = CSRGraph.from_graph(g)
+    assert list(csr.edge_list()) == list(g.edge_list())
+    spa = DijkstraShortestPath(csr, 0)
+    assert spa.distance(3) == 2
+    assert spa.distance(4) == 4
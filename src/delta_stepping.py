@@ -0,0 +1,219 @@
+"""
+Delta-stepping single source shortest paths, with the edge relaxations spread over a pool of processes.
+
+Dijkstra's algorithm settles one vertex at a time which leaves no room for parallelism. Delta-stepping
+relaxes the order: tentative distances are kept in buckets of width delta, bucket i holding the vertices
+with a tentative distance in [i * delta, (i + 1) * delta), and all the vertices of the smallest non-empty
+bucket are processed together.
+
+Edges are split into light edges, with a weight of at most delta, and heavy edges. Relaxing a light edge
+out of bucket i may insert its head into the same bucket, so the light edges of bucket i are relaxed
+in phases until the bucket stays empty. Heavy edges always lead into later buckets and are relaxed once,
+for all the vertices removed from bucket i, after the bucket is settled.
+
+    while there are non-empty buckets
+        i = the smallest non-empty bucket
+        R = {}
+        while bucket i is not empty
+            S = the vertices of bucket i, empty bucket i
+            R = R + S
+            relax the light edges of S
+        relax the heavy edges of R
+
+The edge scans of each phase are independent, so the frontier is cut into chunks that worker processes
+scan in parallel. Each worker maps the same binary snapshot of the graph (see graph_snapshot) and returns
+the best relaxation request per target vertex; the driver applies the requests and updates the buckets.
+A small delta approaches Dijkstra's algorithm with little parallelism per phase, a large delta approaches
+Bellman-Ford with a lot of parallelism but also many re-relaxations.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from dijkstra import INFINITY
+from graph_snapshot import save_binary, load_binary
+from csr_graph import CSRGraph
+
+# the graph mapped by each worker process
+_worker_graph = None
+
+
+def _init_worker(snapshot_path):
+    global _worker_graph
+    _worker_graph = load_binary(snapshot_path, mmap=True)
+
+
+def _scan(graph, frontier, delta, light):
+    """
+    Scans the light or heavy edges of the (vertex, distance) pairs of the frontier and returns the
+    shortest (target, distance, parent) request for each target. The edges of an unweighted graph
+    weigh 1.
+    """
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    requests = {}
+    for (v, d) in frontier:
+        for i in range(offsets[v], offsets[v + 1]):
+            weight = weights[i] if weights is not None else 1
+            if (weight <= delta) == light:
+                w = targets[i]
+                nd = d + weight
+                if w not in requests or nd < requests[w][0]:
+                    requests[w] = (nd, v)
+    return [(w, nd, v) for (w, (nd, v)) in requests.items()]
+
+
+def _worker_scan(args):
+    frontier, delta, light = args
+    return _scan(_worker_graph, frontier, delta, light)
+
+
+class DeltaSteppingShortestPath:
+    def __init__(self, graph, source, delta=None, workers=1, parallel_threshold=1024, chunk_size=512):
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_graph(graph)
+        self.source = source
+        self.delta = delta if delta is not None else self._default_delta()
+
+        # frontiers smaller than parallel_threshold are scanned by the driver itself
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+
+        self.distances = [INFINITY for _ in range(self.graph.V())]
+        self.parent_chain = [None for _ in range(self.graph.V())]
+        self.buckets = {}
+
+        # the number of light edge phases, a measure of the available parallelism
+        self.num_phases = 0
+
+        self._pool = None
+        self._snapshot_path = None
+        try:
+            if workers > 1:
+                self._start_pool()
+            self._delta_stepping()
+        finally:
+            self._stop_pool()
+
+    def _default_delta(self):
+        """
+        The average edge weight, every vertex then has about one light edge per unit of its degree.
+        The edges of an unweighted graph all weigh 1.
+        """
+        weights = self.graph.weights
+        if weights is None or len(weights) == 0:
+            return 1.0
+        return max(sum(weights) / float(len(weights)), 1e-9)
+
+    def _start_pool(self):
+        self._snapshot_path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+        save_binary(self.graph, self._snapshot_path)
+        self._pool = multiprocessing.Pool(self.workers, _init_worker, (self._snapshot_path,))
+
+    def _stop_pool(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._snapshot_path is not None:
+            os.remove(self._snapshot_path)
+            os.rmdir(os.path.dirname(self._snapshot_path))
+            self._snapshot_path = None
+
+    def _delta_stepping(self):
+        self._relax([(self.source, 0, None)])
+
+        while self.buckets:
+            i = min(self.buckets)
+            settled = set()
+            while i in self.buckets:
+                bucket = self.buckets.pop(i)
+                settled.update(bucket)
+                self.num_phases += 1
+                self._relax(self._requests([(v, self.distances[v]) for v in bucket], True))
+
+            self._relax(self._requests([(v, self.distances[v]) for v in settled], False))
+
+    def _requests(self, frontier, light):
+        if self._pool is None or len(frontier) < self.parallel_threshold:
+            return _scan(self.graph, frontier, self.delta, light)
+
+        chunks = [(frontier[i:i + self.chunk_size], self.delta, light)
+                  for i in range(0, len(frontier), self.chunk_size)]
+        requests = []
+        for chunk_requests in self._pool.imap_unordered(_worker_scan, chunks):
+            requests.extend(chunk_requests)
+        return requests
+
+    def _relax(self, requests):
+        for (w, d, parent) in requests:
+            if d < self.distances[w]:
+                # the old bucket is gone if it is the one being processed
+                old = int(self.distances[w] // self.delta) if self.distances[w] != INFINITY else None
+                if old in self.buckets:
+                    self.buckets[old].discard(w)
+                    if not self.buckets[old]:
+                        del self.buckets[old]
+
+                self.distances[w] = d
+                self.parent_chain[w] = parent
+                self.buckets.setdefault(int(d // self.delta), set()).add(w)
+
+    def distance(self, v):
+        return self.distances[v]
+
+    def exists_path(self, v):
+        return self.distances[v] != INFINITY
+
+    def path_to(self, v):
+        if not self.exists_path(v):
+            return None
+
+        path = [v]
+        while self.parent_chain[v] is not None:
+            v = self.parent_chain[v]
+            path.append(v)
+        path.reverse()
+        return path
+
+
+if __name__ == "__main__":
+    import timeit
+
+    import graph_utils
+    from dijkstra import DijkstraSolver
+
+    g = graph_utils.load_weighted_adjacency_digraph('../data/dijkstraData.txt')
+    expected = DijkstraSolver(g)
+    expected.query(0)
+    for delta in (1, 100, 1000, 100000):
+        assert DeltaSteppingShortestPath(g, 0, delta).distances == expected.distances
+
+    # an unweighted graph, whose distances are the number of edges
+    g = graph_utils.load_digraph('../data/tinyDG.txt')
+    unweighted = DeltaSteppingShortestPath(CSRGraph.from_graph(g), 0)
+    assert unweighted.delta == 1.0
+    unit = graph_utils.WeightedDigraph(g.V())
+    for v in range(g.V()):
+        for w in g.edges(v):
+            unit.add_weighted_edge(v, w, 1)
+    expected = DijkstraSolver(unit)
+    expected.query(0)
+    assert unweighted.distances == expected.distances
+
+    g = graph_utils.random_weighted_digraph(100000, 400000, seed=1)
+    solver = DijkstraSolver(g)
+    start = timeit.default_timer()
+    solver.query(0)
+    print('dijkstra: %.2fs' % (timeit.default_timer() - start))
+
+    csr = CSRGraph.from_graph(g)
+    for workers in (1, 2, 4):
+        start = timeit.default_timer()
+        ds = DeltaSteppingShortestPath(csr, 0, workers=workers)
+        elapsed = timeit.default_timer() - start
+
+        assert ds.distances == solver.distances
+        assert ds.path_to(99999)[0] == 0
+        print('delta-stepping, delta %.1f, %d workers: %.2fs, %d phases, %d cores'
+              % (ds.delta, workers, elapsed, ds.num_phases, multiprocessing.cpu_count()))
@@ -23,28 +23,68 @@ In this implementation the ordered set is maintained by an indexed min priority
 of the edges and the associated integer corresponds to the vertex index at the arrow of the edge.
 
 The running time of the algorithm is O(ElgV).
+
+When only the distance between two vertices s and t is needed, the search can stop as soon as t is
+removed from the queue since its distance is final at that point. Similarly, a search bounded by a
+radius D can stop once the smallest queued distance exceeds D; all the vertices within distance D
+have been settled by then.
+
+A bidirectional search runs two such searches at the same time, one forward from s on the graph
+and one backward from t on the reverse graph, always advancing the side with the smallest queued
+distance. Whenever an edge scan reaches a vertex already labelled by the other side, the length of
+the path through that vertex is a candidate for the shortest distance mu. The search stops once the
+sum of the smallest queued distances of the two sides is no less than mu. Each side explores roughly
+a ball of half the radius, which on graphs that expand evenly settles far fewer vertices than a
+single search from s.
+
+The queue is chosen with the queue argument:
+    -'binary', the default, a binary heap.
+    -'4-ary', '8-ary' or any 'd-ary', a shallower d-ary heap with cheaper decrease-key operations.
+    -'pairing', a pairing heap that decreases keys in constant time, which pays off on dense graphs.
+    -'dial', Dial's buckets, which remove the minimum in time proportional to the largest weight.
+    -'radix', a radix heap, which removes the minimum in time logarithmic in the largest weight.
+The last two are monotone queues that insert and decrease keys in constant time. They require
+non-negative integer weights, as in road networks measured in metres or seconds.
+
+Running many queries on the same graph with DijkstraShortestPath allocates and initialises arrays of
+size V for every query. DijkstraSolver allocates them once and remembers which entries a query
+modified, so that the next query only resets those. The cost of a query then depends on the part
+of the graph it explores rather than on the size of the graph.
 """
 
 from graph_utils import *
 import priority_queue
+from priority_queue import make_queue, INFINITY
 
 
 class DijkstraShortestPath:
-    def __init__(self, graph, source):
+    """
+    When a target is given the search stops once the target is settled, when a radius is given it
+    stops once the remaining vertices are further than the radius. In both cases only the distances
+    of the settled vertices are final.
+    """
+    def __init__(self, graph, source, target=None, radius=None, queue='binary'):
         self.graph = graph
 
         # the starting vertex, all shortest paths start from this vertex
         self.source = source
 
+        # optional stopping conditions
+        self.target = target
+        self.radius = radius
+
+        # number of vertices removed from the queue with their final distance
+        self.num_settled = 0
+
         # initialise current vertex distances to infinity
-        self.distances = [1e1000 for _ in range(graph.V())]
+        self.distances = [INFINITY for _ in range(graph.V())]
 
         # each entry indicates the parent vertex from which we arrived to the current vertex
         # follow the parent links in reverse order to reconstruct the shortest path to any vertex
         self.parent_chain = [None for _ in range(graph.V())]
 
         # stores the pending edges prioritised by their weight
-        self.edges_queue = priority_queue.IndexedPriorityQueue(graph.V())
+        self.edges_queue = make_queue(queue, graph)
 
         self._dijkstra()
 
@@ -53,7 +93,15 @@ class DijkstraShortestPath:
         self.edges_queue.insert(self.source, 0)
 
         while not self.edges_queue.is_empty():
-            self._relax_edges(self.edges_queue.del_min()[0])
+            v, d = self.edges_queue.del_min()
+            if self.radius is not None and d > self.radius:
+                break
+
+            self.num_settled += 1
+            if v == self.target:
+                break
+
+            self._relax_edges(v)
 
     def _relax_edges(self, v):
         for (vtx, weight) in self.graph.edges(v):
@@ -71,21 +119,222 @@ class DijkstraShortestPath:
 
     def path_to(self, v):
         assert v < len(self.distances)
+        if not self.exists_path(v):
+            return None
+
         path = [v]
-        while self.parent_chain[v] is None:
+        while self.parent_chain[v] is not None:
             path.append(self.parent_chain[v])
             v = self.parent_chain[v]
-        return path.reverse()
+        path.reverse()
+        return path
 
     def exists_path(self, v):
         assert v < len(self.distances)
-        return self.parent_chain[v] is not None
+        return v == self.source or self.parent_chain[v] is not None
+
+    def within_radius(self):
+        """
+        Returns the vertices whose distance from the source is within the search radius.
+        """
+        return [v for v in range(len(self.distances)) if self.distances[v] <= self.radius]
+
+
+class DijkstraSolver:
+    """
+    A Dijkstra search bound to a graph which keeps its distance, parent and queue arrays between
+    queries and only resets the entries touched by the previous query.
+
+        solver = DijkstraSolver(graph)
+        solver.query(s, target=t)
+        solver.distance(t)
+    """
+    def __init__(self, graph, queue='binary'):
+        self.graph = graph
+        self.source = None
+        self.radius = None
+        self.num_settled = 0
+
+        self.distances = [INFINITY for _ in range(graph.V())]
+        self.parent_chain = [None for _ in range(graph.V())]
+        self.edges_queue = make_queue(queue, graph)
+
+        # the vertices whose distance was set by the last query
+        self.touched = []
+
+    def query(self, source, target=None, radius=None):
+        """
+        Runs a search from source with the same stopping conditions as DijkstraShortestPath and
+        returns the distance of the target, if one was given.
+        """
+        self._reset()
+
+        distances = self.distances
+        parent_chain = self.parent_chain
+        queue = self.edges_queue
+        touched = self.touched
+
+        self.source = source
+        self.radius = radius
+        distances[source] = 0
+        touched.append(source)
+        queue.insert(source, 0)
+
+        while not queue.is_empty():
+            v, d = queue.del_min()
+            if radius is not None and d > radius:
+                break
+
+            self.num_settled += 1
+            if v == target:
+                break
+
+            for (vtx, weight) in self.graph.edges(v):
+                previous = distances[vtx]
+                if previous > d + weight:
+                    distances[vtx] = d + weight
+                    parent_chain[vtx] = v
+                    # with non-negative weights a vertex whose distance drops is never settled,
+                    # so it is queued exactly when it has been reached before
+                    if previous == INFINITY:
+                        touched.append(vtx)
+                        queue.insert(vtx, d + weight)
+                    else:
+                        queue.decrease(vtx, d + weight)
+
+        return distances[target] if target is not None else None
+
+    def _reset(self):
+        for v in self.touched:
+            self.distances[v] = INFINITY
+            self.parent_chain[v] = None
+        self.touched = []
+        self.edges_queue.clear()
+        self.num_settled = 0
+
+    def distance(self, v):
+        return self.distances[v]
+
+    def exists_path(self, v):
+        return v == self.source or self.parent_chain[v] is not None
+
+    def path_to(self, v):
+        if not self.exists_path(v):
+            return None
+
+        path = [v]
+        while self.parent_chain[v] is not None:
+            v = self.parent_chain[v]
+            path.append(v)
+        path.reverse()
+        return path
+
+    def within_radius(self):
+        return [v for v in self.touched if self.distances[v] <= self.radius]
+
+
+class BidirectionalDijkstra:
+    """
+    Finds the shortest path from source to target by searching forward from the source and backward
+    from the target on the reverse graph. The reverse graph can be passed in to be shared by several
+    queries, otherwise it is computed from graph.reverse().
+    """
+    def __init__(self, graph, source, target, reverse_graph=None):
+        self.graph = graph
+        self.reverse_graph = reverse_graph if reverse_graph is not None else graph.reverse()
+        self.source = source
+        self.target = target
+
+        n = graph.V()
+        self.forward_distances = [INFINITY for _ in range(n)]
+        self.backward_distances = [INFINITY for _ in range(n)]
+        self.forward_parents = [None for _ in range(n)]
+        self.backward_parents = [None for _ in range(n)]
+
+        # length of the shortest path found so far and the vertex where both searches met
+        self.mu = INFINITY
+        self.meeting_vertex = None
+
+        self.num_settled = 0
+
+        self._dijkstra()
+
+    def _dijkstra(self):
+        forward_queue = priority_queue.IndexedPriorityQueue(self.graph.V())
+        backward_queue = priority_queue.IndexedPriorityQueue(self.graph.V())
+
+        self.forward_distances[self.source] = 0
+        self.backward_distances[self.target] = 0
+        forward_queue.insert(self.source, 0)
+        backward_queue.insert(self.target, 0)
+        if self.source == self.target:
+            self.mu = 0
+            self.meeting_vertex = self.source
+
+        while True:
+            forward_min = INFINITY if forward_queue.is_empty() else forward_queue.min_key()
+            backward_min = INFINITY if backward_queue.is_empty() else backward_queue.min_key()
+            if forward_min + backward_min >= self.mu or forward_min == backward_min == INFINITY:
+                break
+
+            if forward_min <= backward_min:
+                self._scan(forward_queue, self.graph, self.forward_distances, self.forward_parents,
+                           self.backward_distances)
+            else:
+                self._scan(backward_queue, self.reverse_graph, self.backward_distances, self.backward_parents,
+                           self.forward_distances)
+
+    def _scan(self, queue, graph, distances, parents, other_distances):
+        v = queue.del_min()[0]
+        self.num_settled += 1
+
+        for (vtx, weight) in graph.edges(v):
+            d = distances[v] + weight
+            if distances[vtx] > d:
+                distances[vtx] = d
+                parents[vtx] = v
+                if queue.contains(vtx):
+                    queue.decrease(vtx, d)
+                else:
+                    queue.insert(vtx, d)
+
+            if distances[vtx] + other_distances[vtx] < self.mu:
+                self.mu = distances[vtx] + other_distances[vtx]
+                self.meeting_vertex = vtx
+
+    def distance(self):
+        return self.mu
+
+    def exists_path(self):
+        return self.meeting_vertex is not None
+
+    def path(self):
+        if not self.exists_path():
+            return None
+
+        path = []
+        v = self.meeting_vertex
+        while v is not None:
+            path.append(v)
+            v = self.forward_parents[v]
+        path.reverse()
+
+        v = self.backward_parents[self.meeting_vertex]
+        while v is not None:
+            path.append(v)
+            v = self.backward_parents[v]
+        return path
 
 
 if __name__ == "__main__":
-    graph = load_weighted_digraph('data/dijkstraData.txt')
+    import random
+    import timeit
+
+    graph = load_weighted_adjacency_digraph('../data/dijkstraData.txt')
     dsp = DijkstraShortestPath(graph, 0)
-    print(','.join([str(dsp.distance(i - 1)) for i in (7, 37, 59, 82, 99, 115, 133, 165, 188, 197)]))
+    distances = [dsp.distance(i - 1) for i in (7, 37, 59, 82, 99, 115, 133, 165, 188, 197)]
+    print(','.join([str(int(d)) for d in distances]))
+    assert distances == [2599, 2610, 2947, 2052, 2367, 2399, 2029, 2442, 2505, 3068]
 
     g = WeightedDigraph(5)
     g.add_weighted_edge(0, 1, 1)
@@ -99,3 +348,91 @@ if __name__ == "__main__":
     assert spa.exists_path(3)
     assert spa.distance(3) == 2
     assert spa.distance(4) == 4
+    assert spa.path_to(4) == [0, 2, 4]
+
+    assert DijkstraShortestPath(g, 0, target=3).distance(3) == 2
+    assert sorted(DijkstraShortestPath(g, 0, radius=1).within_radius()) == [0, 1]
+
+    bd = BidirectionalDijkstra(g, 0, 4)
+    assert bd.distance() == 4 and bd.path() == [0, 2, 4]
+    assert not BidirectionalDijkstra(g, 4, 0).exists_path()
+
+    def benchmark(name, graph, num_queries):
+        reverse_graph = graph.reverse()
+        rnd = random.Random(7)
+        queries = [(rnd.randrange(graph.V()), rnd.randrange(graph.V())) for _ in range(num_queries)]
+
+        totals = {'full': [0.0, 0], 'early': [0.0, 0], 'bidirectional': [0.0, 0]}
+        for (s, t) in queries:
+            start = timeit.default_timer()
+            full = DijkstraShortestPath(graph, s)
+            totals['full'][0] += timeit.default_timer() - start
+            totals['full'][1] += full.num_settled
+
+            start = timeit.default_timer()
+            early = DijkstraShortestPath(graph, s, target=t)
+            totals['early'][0] += timeit.default_timer() - start
+            totals['early'][1] += early.num_settled
+
+            start = timeit.default_timer()
+            bd = BidirectionalDijkstra(graph, s, t, reverse_graph)
+            totals['bidirectional'][0] += timeit.default_timer() - start
+            totals['bidirectional'][1] += bd.num_settled
+
+            assert full.distance(t) == early.distance(t) == bd.distance()
+
+        for mode in ('full', 'early', 'bidirectional'):
+            t, settled = totals[mode]
+            print('%s %s: %.3f ms/query, %d settled/query'
+                  % (name, mode, 1000 * t / num_queries, settled / num_queries))
+
+    solver = DijkstraSolver(g)
+    assert solver.query(0, target=4) == 4 and solver.path_to(4) == [0, 2, 4]
+    assert solver.query(3, target=0) == INFINITY and not solver.exists_path(0)
+    solver.query(3, radius=4)
+    assert sorted(solver.within_radius()) == [3, 4]
+    solver.query(0, radius=1)
+    assert sorted(solver.within_radius()) == [0, 1]
+
+    benchmark('dijkstraData', graph, 100)
+    benchmark('random 20000', random_weighted_digraph(20000, 60000, seed=1), 10)
+
+    # many small radius-bounded queries, where the O(V) initialisation dominates
+    graph = random_weighted_digraph(20000, 60000, seed=1)
+    rnd = random.Random(3)
+    sources = [rnd.randrange(graph.V()) for _ in range(200)]
+
+    start = timeit.default_timer()
+    fresh = [DijkstraShortestPath(graph, s, radius=20).within_radius() for s in sources]
+    fresh_time = timeit.default_timer() - start
+
+    solver = DijkstraSolver(graph)
+    start = timeit.default_timer()
+    reused = []
+    for s in sources:
+        solver.query(s, radius=20)
+        reused.append(solver.within_radius())
+    reused_time = timeit.default_timer() - start
+
+    assert [sorted(r) for r in fresh] == [sorted(r) for r in reused]
+    print('radius queries: %.3f ms/query fresh, %.3f ms/query reused workspace'
+          % (1000 * fresh_time / len(sources), 1000 * reused_time / len(sources)))
+
+    # d-ary and monotone queues against the binary heap, small and large integer weights
+    for (name, graph) in (('dijkstraData', load_weighted_adjacency_digraph('../data/dijkstraData.txt')),
+                          ('random 50000', random_weighted_digraph(50000, 400000, seed=1)),
+                          ('dense random 1000', random_weighted_digraph(1000, 200000, seed=1)),
+                          ('grid weights 1-10', grid_weighted_digraph(100, 100, max_weight=10, seed=1)),
+                          ('grid weights 1-100000', grid_weighted_digraph(100, 100, max_weight=100000, seed=1))):
+        expected = None
+        for queue in ('binary', '4-ary', '8-ary', 'pairing', 'dial', 'radix'):
+            solver = DijkstraSolver(graph, queue)
+            start = timeit.default_timer()
+            for s in range(0, graph.V(), graph.V() // 10):
+                solver.query(s)
+            elapsed = timeit.default_timer() - start
+
+            if expected is None:
+                expected = solver.distances[:]
+            assert solver.distances == expected
+            print('%s %s: %.2f ms/query' % (name, queue, 100 * elapsed))
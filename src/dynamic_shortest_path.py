@@ -0,0 +1,236 @@
+"""
+Maintains single source shortest paths in a weighted digraph whose edge weights change over time,
+in the style of Ramalingam and Reps.
+
+Recomputing the shortest path tree after every weight change redoes the work for the whole graph while
+an update usually affects a small part of it. The repair depends on the direction of the change.
+
+When the weight of an edge u -> v drops, or a new edge appears, only vertices whose distance improves
+change. If d(u) + w(u, v) < d(v) a Dijkstra search is started from v with its new distance and it
+only continues through vertices whose distance improves.
+
+When the weight of an edge u -> v grows, only the vertices of the subtree of v in the shortest path tree
+can be affected, and only if u -> v is a tree edge. The repair runs in two phases:
+
+    -Identify the affected vertices. The subtree is walked in order of increasing distance. A vertex x is
+     not affected if it has an inbound edge y -> x from an unaffected vertex y with d(y) + w(y, x) = d(x),
+     in which case y becomes its parent and the subtree below x keeps its distances. Otherwise x is
+     affected and its children are examined as well.
+    -Recompute the affected vertices. Each one gets the best distance through its inbound edges from
+     unaffected vertices, and a Dijkstra search restricted to the affected vertices settles the rest.
+
+The work of both repairs is proportional to the number of vertices whose shortest path changes and their
+edges, which the touched counters report. The algorithm assumes positive weights, like Dijkstra's.
+"""
+
+import priority_queue
+from dijkstra import DijkstraSolver, INFINITY
+
+
+class DynamicShortestPath:
+    def __init__(self, graph, source):
+        n = graph.V()
+        self.source = source
+
+        # the topology and the current weights, parallel edges are collapsed to the lightest one
+        self.out_edges = [{} for _ in range(n)]
+        self.in_edges = [{} for _ in range(n)]
+        for v in range(n):
+            for (w, weight) in graph.edges(v):
+                if weight < self.out_edges[v].get(w, INFINITY):
+                    self.out_edges[v][w] = weight
+                    self.in_edges[w][v] = weight
+
+        solver = DijkstraSolver(graph)
+        solver.query(source)
+        self.distances = solver.distances[:]
+        self.parent_chain = solver.parent_chain[:]
+
+        self.children = [set() for _ in range(n)]
+        for v in range(n):
+            if self.parent_chain[v] is not None:
+                self.children[self.parent_chain[v]].add(v)
+
+        self.queue = priority_queue.IndexedPriorityQueue(n)
+
+        # vertices popped by the last update and by all the updates, the affected vertices of an
+        # increase count twice, once when classified and once when their distances are recomputed
+        self.last_touched = 0
+        self.total_touched = 0
+        self.num_updates = 0
+
+    def add_edge(self, u, v, weight):
+        """
+        Adds the edge u -> v, or lowers the weight of an existing one to weight.
+        """
+        if weight < self.out_edges[u].get(v, INFINITY):
+            self.update_edge(u, v, weight)
+
+    def update_edge(self, u, v, weight):
+        old = self.out_edges[u].get(v, INFINITY)
+        self.out_edges[u][v] = weight
+        self.in_edges[v][u] = weight
+
+        self.last_touched = 0
+        if weight < old:
+            self._decrease(u, v, weight)
+        elif weight > old and self.parent_chain[v] == u:
+            self._increase(v)
+
+        self.total_touched += self.last_touched
+        self.num_updates += 1
+
+    def _set_parent(self, v, parent):
+        if self.parent_chain[v] is not None:
+            self.children[self.parent_chain[v]].discard(v)
+        self.parent_chain[v] = parent
+        if parent is not None:
+            self.children[parent].add(v)
+
+    def _decrease(self, u, v, weight):
+        if self.distances[u] + weight >= self.distances[v]:
+            return
+
+        queue = self.queue
+        self.distances[v] = self.distances[u] + weight
+        self._set_parent(v, u)
+        queue.insert(v, self.distances[v])
+        queued = set([v])
+
+        while not queue.is_empty():
+            x, d = queue.del_min()
+            queued.discard(x)
+            self.last_touched += 1
+            for (z, w) in self.out_edges[x].items():
+                if d + w < self.distances[z]:
+                    self.distances[z] = d + w
+                    self._set_parent(z, x)
+                    if z in queued:
+                        queue.decrease(z, d + w)
+                    else:
+                        queued.add(z)
+                        queue.insert(z, d + w)
+
+    def _increase(self, v):
+        affected = self._affected(v)
+        queue = self.queue
+
+        for x in affected:
+            self.distances[x] = INFINITY
+            self._set_parent(x, None)
+
+        # the best distance of each affected vertex through the unaffected ones
+        for x in affected:
+            for (y, w) in self.in_edges[x].items():
+                if y not in affected and self.distances[y] + w < self.distances[x]:
+                    self.distances[x] = self.distances[y] + w
+                    self._set_parent(x, y)
+            if self.distances[x] != INFINITY:
+                queue.insert(x, self.distances[x])
+
+        while not queue.is_empty():
+            x, d = queue.del_min()
+            self.last_touched += 1
+            for (z, w) in self.out_edges[x].items():
+                if z in affected and d + w < self.distances[z]:
+                    first = self.distances[z] == INFINITY
+                    self.distances[z] = d + w
+                    self._set_parent(z, x)
+                    if first:
+                        queue.insert(z, d + w)
+                    else:
+                        queue.decrease(z, d + w)
+
+    def _affected(self, v):
+        """
+        Walks the shortest path subtree of v in order of increasing distance, re-parenting the vertices
+        that have an alternative shortest path and returning the ones that do not.
+        """
+        affected = set()
+        queue = self.queue
+        queue.insert(v, self.distances[v])
+
+        while not queue.is_empty():
+            x, d = queue.del_min()
+            self.last_touched += 1
+
+            # with positive weights any candidate y is closer than x and has already been classified,
+            # the parent of x is either the changed edge or an affected vertex
+            alternative = None
+            for (y, w) in self.in_edges[x].items():
+                if y not in affected and self.distances[y] + w == d:
+                    alternative = y
+                    break
+
+            if alternative is not None:
+                self._set_parent(x, alternative)
+            else:
+                affected.add(x)
+                for c in self.children[x]:
+                    queue.insert(c, self.distances[c])
+
+        return affected
+
+    def distance(self, v):
+        return self.distances[v]
+
+    def exists_path(self, v):
+        return self.distances[v] != INFINITY
+
+    def path_to(self, v):
+        if not self.exists_path(v):
+            return None
+
+        path = [v]
+        while self.parent_chain[v] is not None:
+            v = self.parent_chain[v]
+            path.append(v)
+        path.reverse()
+        return path
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+
+    import graph_utils
+
+    def rebuild(dsp):
+        g = graph_utils.WeightedDigraph(len(dsp.out_edges))
+        for u in range(len(dsp.out_edges)):
+            for (v, w) in dsp.out_edges[u].items():
+                g.add_weighted_edge(u, v, w)
+        return g
+
+    graph = graph_utils.grid_weighted_digraph(50, 50, seed=1)
+    dsp = DynamicShortestPath(graph, 0)
+    rnd = random.Random(3)
+    edges = [(u, v) for u in range(graph.V()) for (v, _) in graph.edges(u)]
+
+    incremental_time = 0.0
+    recompute_time = 0.0
+    for i in range(300):
+        u, v = rnd.choice(edges)
+        weight = rnd.randint(1, 100)
+
+        start = timeit.default_timer()
+        if i % 10 == 0:
+            u, v = rnd.randrange(graph.V()), rnd.randrange(graph.V())
+            dsp.add_edge(u, v, weight)
+        else:
+            dsp.update_edge(u, v, weight)
+        incremental_time += timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        solver = DijkstraSolver(rebuild(dsp))
+        solver.query(0)
+        recompute_time += timeit.default_timer() - start
+
+        assert dsp.distances == solver.distances
+        for x in (v, graph.V() - 1):
+            path = dsp.path_to(x)
+            assert path[0] == 0 and sum(dsp.out_edges[path[j]][path[j + 1]] for j in range(len(path) - 1)) == dsp.distance(x)
+
+    print('%d updates: %.2f vertices touched per update, %.3f ms/update incremental, %.3f ms/update recompute'
+          % (dsp.num_updates, dsp.total_touched / float(dsp.num_updates),
+             1000 * incremental_time / dsp.num_updates, 1000 * recompute_time / dsp.num_updates))
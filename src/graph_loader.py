@@ -0,0 +1,146 @@
+"""
+Bulk loaders for the edge list files understood by graph_utils.load_graph, load_weighted_graph
+and load_weighted_digraph.
+
+The graph_utils loaders read all the lines of a file at once, split and convert every line on
+its own and add each edge through add_edge, which validates both endpoints. For large inputs the
+per-line and per-edge overhead dominates the loading time.
+
+The bulk loader reads the file in fixed size chunks. Every chunk is cut at its last line break,
+the incomplete tail is carried over to the next chunk, and the chunk is tokenised with a single
+split call (or a single numpy.fromstring call when NumPy is available). The tokens are sliced
+into one column per field and the edges of the chunk are appended to the adjacency lists with
+add_edges/add_weighted_edges, which validate the vertex bounds once per chunk.
+
+The loader keeps track of the number of parsed edges and the elapsed time so that the ingest
+throughput can be reported.
+"""
+
+import timeit
+
+import graph_utils
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class BulkGraphLoader:
+    CHUNK_SIZE = 1 << 22
+
+    def __init__(self, path, zero_based=True, chunk_size=CHUNK_SIZE, use_numpy=True):
+        self.path = path
+        self.zero_based = zero_based
+        self.chunk_size = chunk_size
+        self.use_numpy = use_numpy and numpy is not None
+
+        self.num_edges = 0
+        self.elapsed = 0.0
+
+    def load_graph(self, directed=False):
+        g_type = graph_utils.Digraph if directed else graph_utils.Graph
+        return self._load(g_type, 2, lambda g, cols: g.add_edges(cols[0], cols[1]))
+
+    def load_digraph(self):
+        return self.load_graph(True)
+
+    def load_weighted_graph(self):
+        return self._load(graph_utils.WeightedGraph, 3,
+                          lambda g, cols: g.add_weighted_edges(cols[0], cols[1], cols[2]))
+
+    def load_weighted_digraph(self):
+        return self._load(graph_utils.WeightedDigraph, 3,
+                          lambda g, cols: g.add_weighted_edges(cols[0], cols[1], cols[2]))
+
+    def edges_per_second(self):
+        return self.num_edges / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _load(self, g_type, num_columns, add_columns):
+        start = timeit.default_timer()
+        self.num_edges = 0
+
+        with open(self.path, "r") as f:
+            # the header may also carry the number of edges, only the vertex count is needed
+            g = g_type(int(f.readline().split()[0]))
+
+            tail = ''
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+
+                chunk = tail + chunk
+                cut = chunk.rfind('\n') + 1
+                if cut == 0:
+                    tail = chunk
+                    continue
+
+                chunk, tail = chunk[:cut], chunk[cut:]
+                self._add_chunk(g, chunk, num_columns, add_columns)
+
+            if tail.strip():
+                self._add_chunk(g, tail, num_columns, add_columns)
+
+        self.elapsed = timeit.default_timer() - start
+        return g
+
+    def _add_chunk(self, g, chunk, num_columns, add_columns):
+        columns = self._parse_columns(chunk, num_columns)
+        add_columns(g, columns)
+        self.num_edges += len(columns[0])
+
+    def _parse_columns(self, chunk, num_columns):
+        offset = 0 if self.zero_based else 1
+
+        if self.use_numpy:
+            values = numpy.fromstring(chunk, dtype=numpy.float64, sep=' ')
+            if len(values) % num_columns != 0:
+                raise ValueError("malformed edge list in " + self.path)
+
+            values = values.reshape(-1, num_columns)
+            columns = [(values[:, i].astype(numpy.int64) - offset).tolist() for i in (0, 1)]
+            if num_columns == 3:
+                columns.append(values[:, 2].tolist())
+            return columns
+
+        tokens = chunk.split()
+        if len(tokens) % num_columns != 0:
+            raise ValueError("malformed edge list in " + self.path)
+
+        columns = [[int(x) - offset for x in tokens[i::num_columns]] for i in (0, 1)]
+        if num_columns == 3:
+            columns.append([float(x) for x in tokens[2::num_columns]])
+        return columns
+
+
+if __name__ == "__main__":
+
+    def same_graph(g1, g2):
+        if g1.V() != g2.V() or g1.E() != g2.E():
+            return False
+        return all(g1.edges(v) == g2.edges(v) for v in range(g1.V()))
+
+    def report(name, loader, slow_time):
+        print('%s: %d edges, %.0f edges/sec, %.2fx faster than graph_utils'
+              % (name, loader.num_edges, loader.edges_per_second(), slow_time / loader.elapsed))
+
+    def timed(f, *args):
+        start = timeit.default_timer()
+        result = f(*args)
+        return result, timeit.default_timer() - start
+
+    g, t = timed(graph_utils.load_graph, '../data/mediumG.txt')
+    loader = BulkGraphLoader('../data/mediumG.txt')
+    assert same_graph(g, loader.load_graph())
+    report('mediumG', loader, t)
+
+    g, t = timed(graph_utils.load_weighted_graph, '../data/clustering1.txt', False)
+    loader = BulkGraphLoader('../data/clustering1.txt', zero_based=False)
+    assert same_graph(g, loader.load_weighted_graph())
+    report('clustering1', loader, t)
+
+    g, t = timed(graph_utils.load_weighted_digraph, '../data/floyd-warshall-1000.txt')
+    loader = BulkGraphLoader('../data/floyd-warshall-1000.txt', zero_based=False, chunk_size=4096)
+    assert same_graph(g, loader.load_weighted_digraph())
+    report('floyd-warshall-1000', loader, t)
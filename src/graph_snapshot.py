@@ -0,0 +1,252 @@
+"""
+A binary snapshot format for the graphs of graph_utils and csr_graph.
+
+Parsing the text files of the data directory on every run costs far more than opening a graph
+that is already laid out in memory order. A snapshot stores the compressed sparse row form of a
+graph (see csr_graph) behind a fixed size header:
+
+    offset  size            field
+    0       4               magic number 'CSRG'
+    4       2               format version
+    6       2               flags, bit 0 set for weighted and bit 1 set for directed graphs
+    8       8               number of vertices V
+    16      8               number of edges as reported by E()
+    24      8               number of stored edges M (undirected edges are stored twice)
+    32      8 * (V + 1)     offsets, little-endian int64
+    ...     4 * M           targets, little-endian int32
+    ...     8 * M           weights, little-endian float64, weighted graphs only, 8-byte aligned
+
+Loading with mmap=True maps the file copy-on-write and exposes the three arrays as views over the
+mapping, so opening a snapshot does not depend on its size and worker processes that map the same
+file share the same physical pages through the page cache, as long as nobody writes to them. The
+views are numpy arrays when NumPy is available and ctypes arrays of little-endian integers and
+doubles otherwise, on both Python 2 and 3. Slicing a ctypes array returns a list, which CSRGraph
+accepts in place of tolist(). is_mapped tells whether the arrays of a graph are such views.
+"""
+
+from array import array
+import ctypes
+import mmap as mmap_module
+import struct
+import sys
+
+from csr_graph import CSRGraph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'CSRG'
+VERSION = 1
+HEADER = struct.Struct('<4sHHqqq')
+
+WEIGHTED_FLAG = 1
+DIRECTED_FLAG = 2
+
+
+# typecodes of the int64 offsets, int32 targets and float64 weights as CSRGraph holds them in memory
+_OFFSET_CODE = CSRGraph.OFFSET_TYPE
+_TARGET_CODE = 'i'
+_WEIGHT_CODE = 'd'
+
+
+def _int64_code():
+    # Python 2 has no 'q' typecode, its 'l' is 8 bytes wide on 64-bit Unix but 4 bytes on Windows
+    for code in ('l', 'q'):
+        try:
+            if array(code).itemsize == 8:
+                return code
+        except ValueError:
+            pass
+    return None
+
+# the typecode of 8 byte integer arrays, None on the platforms that have none
+INT64_CODE = _int64_code()
+
+# the little-endian numpy and ctypes types of each typecode
+_DTYPES = {_OFFSET_CODE: '<i8', _TARGET_CODE: '<i4', _WEIGHT_CODE: '<f8'}
+_CTYPES = {_OFFSET_CODE: ctypes.c_int64.__ctype_le__, _TARGET_CODE: ctypes.c_int32.__ctype_le__,
+           _WEIGHT_CODE: ctypes.c_double.__ctype_le__}
+
+
+def _to_bytes(a):
+    return a.tobytes() if hasattr(a, 'tobytes') else a.tostring()
+
+
+def int64_to_bytes(values):
+    """
+    Returns the integers as little-endian int64 bytes.
+    """
+    if INT64_CODE is None:
+        return struct.pack('<%dq' % len(values), *values)
+
+    a = array(INT64_CODE, values)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return _to_bytes(a)
+
+
+def int64_from_file(f, count):
+    """
+    Reads count little-endian int64 integers into an array, an array('l') on the platforms without
+    an 8 byte typecode, which raises OverflowError if a value does not fit.
+    """
+    if INT64_CODE is None:
+        return array('l', struct.unpack('<%dq' % count, f.read(8 * count)))
+
+    a = array(INT64_CODE)
+    a.fromfile(f, count)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+
+def _padding(position, alignment):
+    return (alignment - position % alignment) % alignment
+
+
+def _layout(num_vertex, num_stored):
+    offsets_start = HEADER.size
+    targets_start = offsets_start + 8 * (num_vertex + 1)
+    targets_end = targets_start + 4 * num_stored
+    weights_start = targets_end + _padding(targets_end, 8)
+    return offsets_start, targets_start, weights_start
+
+
+def save_binary(graph, path):
+    """
+    Writes a snapshot of the graph, which may be a CSRGraph or any of the graph_utils classes.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_graph(graph)
+
+    num_vertex = csr.V()
+    num_stored = len(csr.targets)
+    flags = (WEIGHTED_FLAG if csr.is_weighted() else 0) | (DIRECTED_FLAG if csr.is_directed() else 0)
+
+    arrays = [array(_TARGET_CODE, csr.targets)]
+    if csr.is_weighted():
+        arrays.append(array(_WEIGHT_CODE, csr.weights))
+
+    if sys.byteorder == 'big':
+        for a in arrays:
+            a.byteswap()
+
+    _, _, weights_start = _layout(num_vertex, num_stored)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, num_vertex, csr.E(), num_stored))
+        f.write(int64_to_bytes(csr.offsets))
+        f.write(_to_bytes(arrays[0]))
+        if csr.is_weighted():
+            f.write(b'\0' * (weights_start - f.tell()))
+            f.write(_to_bytes(arrays[1]))
+
+
+def load_binary(path, mmap=True):
+    """
+    Opens a snapshot written by save_binary and returns it as a CSRGraph.
+    """
+    with open(path, 'rb') as f:
+        magic, version, flags, num_vertex, num_edges, num_stored = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a graph snapshot" % path)
+
+        weighted = bool(flags & WEIGHTED_FLAG)
+        offsets_start, targets_start, weights_start = _layout(num_vertex, num_stored)
+        sections = [(offsets_start, _OFFSET_CODE, num_vertex + 1), (targets_start, _TARGET_CODE, num_stored)]
+        if weighted:
+            sections.append((weights_start, _WEIGHT_CODE, num_stored))
+
+        if mmap:
+            # copy-on-write rather than read-only, ctypes only maps writable buffers
+            buf = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_COPY)
+            arrays = [_view(buf, start, code, count) for (start, code, count) in sections]
+        else:
+            arrays = []
+            for (start, code, count) in sections:
+                f.seek(start)
+                if code == _OFFSET_CODE:
+                    arrays.append(int64_from_file(f, count))
+                    continue
+                a = array(code)
+                a.fromfile(f, count)
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                arrays.append(a)
+
+    weights = arrays[2] if weighted else None
+    graph = CSRGraph(num_vertex, num_edges, arrays[0], arrays[1], weights, bool(flags & DIRECTED_FLAG))
+    if mmap:
+        graph.mapping = buf
+    return graph
+
+
+def _view(buf, start, code, count):
+    if numpy is not None:
+        return numpy.frombuffer(buf, dtype=_DTYPES[code], count=count, offset=start)
+    return (_CTYPES[code] * count).from_buffer(buf, start)
+
+
+def _address(a):
+    if numpy is not None and isinstance(a, numpy.ndarray):
+        return a.__array_interface__['data'][0]
+    return ctypes.addressof(a)
+
+
+def is_mapped(graph):
+    """
+    Returns whether the arrays of the graph are views over the mapping of a snapshot opened by
+    load_binary with mmap=True, rather than copies.
+    """
+    buf = graph.mapping
+    if buf is None:
+        return False
+
+    start = ctypes.addressof(ctypes.c_char.from_buffer(buf))
+    end = start + len(buf)
+    arrays = [a for a in (graph.offsets, graph.targets, graph.weights) if a is not None]
+    return all(start <= _address(a) <= end for a in arrays)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import timeit
+
+    import graph_utils
+    from dijkstra import DijkstraShortestPath
+
+    def check_same(g, snapshot):
+        assert g.V() == snapshot.V() and g.E() == snapshot.E()
+        for v in range(g.V()):
+            assert g.edges(v) == snapshot.edges(v)
+
+    path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+
+    for g in (graph_utils.load_graph('../data/tinyG.txt'),
+              graph_utils.load_digraph('../data/tinyDG.txt'),
+              graph_utils.load_weighted_graph('../data/tinyEWG.txt')):
+        save_binary(g, path)
+        mapped = load_binary(path)
+        check_same(g, mapped)
+        assert is_mapped(mapped)
+        copied = load_binary(path, mmap=False)
+        check_same(g, copied)
+        assert not is_mapped(copied)
+
+    start = timeit.default_timer()
+    g = graph_utils.load_weighted_digraph('../data/floyd-warshall-1000.txt')
+    parse_time = timeit.default_timer() - start
+
+    save_binary(g, path)
+
+    start = timeit.default_timer()
+    snapshot = load_binary(path)
+    load_time = timeit.default_timer() - start
+
+    check_same(g, snapshot)
+    assert DijkstraShortestPath(snapshot, 0).distances == DijkstraShortestPath(g, 0).distances
+
+    print('text parse %.4fs, snapshot open %.6fs' % (parse_time, load_time))
+    os.remove(path)
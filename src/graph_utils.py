@@ -16,6 +16,24 @@ class Graph:
         self._vertices[w].append(v)
         self._num_edges += 1
 
+    def add_edges(self, us, vs):
+        """
+        Adds the edges (us[i], vs[i]) in a single pass. The vertex bounds are validated once
+        for the whole batch instead of once per edge.
+        """
+        self._check_bounds(us, vs)
+        vertices = self._vertices
+        for v, w in zip(us, vs):
+            vertices[v].append(w)
+            vertices[w].append(v)
+        self._num_edges += len(us)
+
+    def _check_bounds(self, us, vs):
+        if len(us) != len(vs):
+            raise ValueError("edge endpoint arrays differ in length")
+        if len(us) > 0 and not (0 <= min(min(us), min(vs)) and max(max(us), max(vs)) < self._num_vertex):
+            raise ValueError("edge endpoint out of range")
+
     def V(self): return self._num_vertex
 
     def E(self): return self._num_edges
@@ -41,9 +59,20 @@ class WeightedGraph(Graph):
         self._vertices[v].append((u, w))
         self._num_edges += 2
 
+    def add_weighted_edges(self, us, vs, ws):
+        self._check_bounds(us, vs)
+        vertices = self._vertices
+        for u, v, w in zip(us, vs, ws):
+            vertices[u].append((v, w))
+            vertices[v].append((u, w))
+        self._num_edges += 2 * len(us)
+
     def add_edge(self, u, w):
         raise Exception("weight is mandatory")
 
+    def add_edges(self, us, vs):
+        raise Exception("weight is mandatory")
+
     def __str__(self):
         s = str(self._num_vertex)
         vs = [str(u) + ' ' + str(v) + ' ' + str(w) for u in range(len(self._vertices)) for (v, w) in self._vertices[u]]
@@ -60,6 +89,13 @@ class Digraph(Graph):
         self._vertices[v].append(w)
         self._num_edges += 1
 
+    def add_edges(self, us, vs):
+        self._check_bounds(us, vs)
+        vertices = self._vertices
+        for v, w in zip(us, vs):
+            vertices[v].append(w)
+        self._num_edges += len(us)
+
     def reverse(self):
         rg = Digraph(self._num_vertex)
         for v in range(len(self._vertices)):
@@ -75,17 +111,27 @@ class WeightedDigraph(Graph):
     def add_edge(self, u, w):
         raise Exception("weight is mandatory")
 
+    def add_edges(self, us, vs):
+        raise Exception("weight is mandatory")
+
     def add_weighted_edge(self, u, v, w):
         assert u < self._num_vertex
         assert v < self._num_vertex
         self._vertices[u].append((v, w))
         self._num_edges += 1
 
+    def add_weighted_edges(self, us, vs, ws):
+        self._check_bounds(us, vs)
+        vertices = self._vertices
+        for u, v, w in zip(us, vs, ws):
+            vertices[u].append((v, w))
+        self._num_edges += len(us)
+
     def reverse(self):
-        rg = Digraph(self._num_vertex)
+        rg = WeightedDigraph(self._num_vertex)
         for v in range(len(self._vertices)):
-            for e in self._vertices[v]:
-                rg.add_weighted_edge(e, v)
+            for (u, w) in self._vertices[v]:
+                rg.add_weighted_edge(u, v, w)
         return rg
 
     def edge_list(self):
@@ -101,6 +147,16 @@ class WeightedDigraph(Graph):
         vs = [str(u) + '-(' + str(w) + ')->' + str(v) for u in range(len(self._vertices)) for (v, w) in self._vertices[u]]
         return os.linesep.join([s] + vs)
 
+def is_directed(graph):
+    """
+    Returns whether the graph stores each edge in one direction only, for the classes of this module
+    and for CSRGraph.
+    """
+    if hasattr(graph, 'is_directed'):
+        return graph.is_directed()
+    return isinstance(graph, (Digraph, WeightedDigraph))
+
+
 def load_graph(path, directed=False, zero_based=True):
     f = open(path, "r")
     num_vertex = int(f.readline())
@@ -115,7 +171,7 @@ def load_graph(path, directed=False, zero_based=True):
 
 def load_weighted_graph(path, zero_based=True):
     with open(path, "r") as f:
-        num_vertex = int(f.readline())
+        num_vertex = int(f.readline().split()[0])
         g = WeightedGraph(num_vertex)
         for ln in f.readlines():
             (u, v, w) = ln.split()
@@ -152,6 +208,55 @@ def load_weighted_digraph(path, zero_based=False):
         g.add_weighted_edge(u, v, w)
     return g
 
+def load_weighted_adjacency_digraph(path, zero_based=False):
+    """
+    Loads a weighted digraph from a file that lists, after the vertex count, one line per vertex
+    holding the vertex followed by a "vertex,weight" pair per outbound edge.
+    """
+    with open(path, "r") as f:
+        num_vertex = int(f.readline().split()[0])
+        g = WeightedDigraph(num_vertex)
+        offset = 0 if zero_based else 1
+        for ln in f.readlines():
+            tokens = ln.split()
+            if not tokens:
+                continue
+            u = int(tokens[0]) - offset
+            for pair in tokens[1:]:
+                v, w = pair.split(',')
+                g.add_weighted_edge(u, int(v) - offset, float(w))
+    return g
+
+def random_weighted_digraph(num_vertex, num_edges, max_weight=100, seed=None):
+    """
+    Generates a digraph with random integer weights in [1, max_weight]. A cycle through all the
+    vertices is added first so that every vertex is reachable from every other vertex.
+    """
+    import random
+    rnd = random.Random(seed)
+    g = WeightedDigraph(num_vertex)
+    for v in range(num_vertex):
+        g.add_weighted_edge(v, (v + 1) % num_vertex, rnd.randint(1, max_weight))
+    for _ in range(num_edges - num_vertex):
+        g.add_weighted_edge(rnd.randrange(num_vertex), rnd.randrange(num_vertex), rnd.randint(1, max_weight))
+    return g
+
+def grid_weighted_digraph(rows, cols, max_weight=100, seed=None):
+    """
+    Generates a road network like digraph, a rows x cols grid where neighbouring vertices are
+    connected in both directions with random integer weights in [1, max_weight].
+    """
+    import random
+    rnd = random.Random(seed)
+    g = WeightedDigraph(rows * cols)
+    for r in range(rows):
+        for c in range(cols):
+            v = r * cols + c
+            for w in ([v + 1] if c + 1 < cols else []) + ([v + cols] if r + 1 < rows else []):
+                g.add_weighted_edge(v, w, rnd.randint(1, max_weight))
+                g.add_weighted_edge(w, v, rnd.randint(1, max_weight))
+    return g
+
 if __name__ == "__main__":
     g = load_graph("../data/tinyG.txt")
     print(g)
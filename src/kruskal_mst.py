@@ -11,41 +11,162 @@ provides amortized constant time for answering connectivity queries.
 
 The running time of the algorithm is O(NlogN) which is actually the time to sort the
 edges of the graph.
+
+The edges do not need to be sorted up front though. A WeightedGraph stores every edge
+in both directions, so only the direction with u < v is kept, and the edges are heapified
+by weight in O(N) and removed from the heap in batches, each one unioned with a single
+union_many call. A batch holds as many edges as the tree still misses, since at least that
+many are needed, and no fewer than MIN_BATCH. The tree is complete once it has V-1 edges, at
+which point the heaviest edges of the graph have never been sorted, which on dense graphs is
+most of them.
+
+When the edges are already available as arrays of endpoints and weights, from_edge_arrays
+orders them with an argsort of the weights, a single numpy.argsort call when NumPy is
+available, and unions the endpoints in one union_many call that stops at a single component.
+
+Filter-Kruskal, selected with mode='filter', avoids most of the sorting altogether. The edges
+are partitioned around the weight of a random pivot edge. The light half is processed first,
+recursively, after which the heavy edges whose endpoints the union-find already connects cannot
+be part of the tree and are filtered out before the heavy half is processed in turn. Partitions
+below FILTER_THRESHOLD edges are sorted and scanned like in Kruskal's algorithm. On dense graphs
+the filter discards almost all the heavy edges with a couple of finds each, without sorting them.
+
+All modes return the same weight. When the weights are distinct the tree is unique and they
+return the same edges as well.
+
+The union-find class is a parameter, for example ArrayUnionFind.
 """
 
+import itertools
+import random
+
 import graph_utils
-from union_find import UnionFind
+from heap import Heap
+from union_find import UnionFind, ArrayUnionFind
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class KruskalMST:
 
-    def __init__(self, graph):
+    FILTER_THRESHOLD = 2048
+    MIN_BATCH = 64
+
+    def __init__(self, graph, union_find=UnionFind, mode='heap', seed=None):
+        if mode not in ('heap', 'filter'):
+            raise ValueError("unknown mode %s" % mode)
+        # the edges are taken once, in the direction u < v, from graphs that store both directions
+        if graph is not None and graph_utils.is_directed(graph):
+            raise ValueError("a minimum spanning tree requires an undirected graph")
+
         self.graph = graph
+        self.union_find = union_find
+        self.mode = mode
         self.w = 0
         self.mst = []
-        self.__mst()
+
+        # the number of edges scanned by the union-find before the tree was complete
+        self.edges_examined = 0
+
+        if graph is not None:
+            if mode == 'filter':
+                self.__filter_mst(random.Random(seed))
+            else:
+                self.__mst()
+
+    @staticmethod
+    def from_edge_arrays(num_vertex, us, vs, ws, union_find=ArrayUnionFind):
+        """
+        Computes the minimum spanning forest of the edges (us[i], vs[i]) weighing ws[i].
+        """
+        mst = KruskalMST(None, union_find)
+
+        if numpy is not None:
+            order = numpy.argsort(numpy.asarray(ws), kind='mergesort')
+            us = numpy.asarray(us)[order].tolist()
+            vs = numpy.asarray(vs)[order].tolist()
+            ws = numpy.asarray(ws)[order].tolist()
+        else:
+            order = sorted(range(len(ws)), key=ws.__getitem__)
+            us = [us[i] for i in order]
+            vs = [vs[i] for i in order]
+            ws = [ws[i] for i in order]
+
+        uf = union_find(num_vertex)
+        merged = uf.union_many(us, vs)
+        mst.mst = [(us[i], vs[i]) for i in merged]
+        mst.w = sum(ws[i] for i in merged)
+        mst.edges_examined = uf.last_scanned
+        return mst
 
     def __mst(self):
-        uf = UnionFind(self.graph.V())
+        uf = self.union_find(self.graph.V())
+        stream = self.__edge_stream()
 
-        for edge in self.__sorted_edges():
-            u, v, w = edge
-            if not uf.connected(u, v):
-                self.mst.append((u, v))
-                uf.union(u, v)
-                self.w += w
+        while uf.count_components() > 1:
+            batch = list(itertools.islice(stream, max(uf.count_components() - 1, KruskalMST.MIN_BATCH)))
+            if not batch:
+                break
+            self.__union_batch(batch, uf)
 
-    def __sorted_edges(self):
-        edges = []
-        for u in range(self.graph.V()):
-            for e in self.graph.edges(u):
+    def __union_batch(self, edges, uf):
+        """
+        Unions the endpoints of the sorted edges until a single component remains and adds the
+        edges that merged two components to the tree.
+        """
+        us = [u for (u, _, _) in edges]
+        vs = [v for (_, v, _) in edges]
+        for i in uf.union_many(us, vs):
+            self.mst.append((us[i], vs[i]))
+            self.w += edges[i][2]
+        self.edges_examined += uf.last_scanned
+
+    def __filter_mst(self, rnd):
+        uf = self.union_find(self.graph.V())
+        edges = [(u, v, w) for u in range(self.graph.V()) for (v, w) in self.graph.edges(u) if u < v]
+        self.__filter_kruskal(edges, uf, self.graph.V() - 1, rnd)
+
+    def __filter_kruskal(self, edges, uf, tree_size, rnd):
+        if len(edges) <= KruskalMST.FILTER_THRESHOLD:
+            edges.sort(key=lambda e: e[2])
+            self.__union_batch(edges, uf)
+            return
 
-                # source vertex, dest vertex, edge weight
-                edges.append((u, e[0], e[1]))
+        pivot = edges[rnd.randrange(len(edges))][2]
+        light = [e for e in edges if e[2] <= pivot]
+        heavy = [e for e in edges if e[2] > pivot]
+        if not heavy:
+            # the pivot is the largest weight, the edges weighing as much as it go last
+            light = [e for e in edges if e[2] < pivot]
+            heavy = [e for e in edges if e[2] == pivot]
+            if not light:
+                # all the weights are equal and can be taken in any order
+                light, heavy = heavy[:len(heavy) // 2], heavy[len(heavy) // 2:]
 
-        def compare_edges(e1, e2):
-            return cmp(e1[2], e2[2])
+        self.__filter_kruskal(light, uf, tree_size, rnd)
+        if len(self.mst) == tree_size:
+            return
 
-        return sorted(edges, compare_edges)
+        find = uf.find
+        heavy = [e for e in heavy if find(e[0]) != find(e[1])]
+        self.__filter_kruskal(heavy, uf, tree_size, rnd)
+
+    def __edge_stream(self):
+        """
+        Yields the edges of the graph, once per direction pair, in ascending order of weight.
+        """
+        edges = []
+        for u in range(self.graph.V()):
+            for (v, w) in self.graph.edges(u):
+                if u < v:
+                    # source vertex, dest vertex, edge weight
+                    edges.append((u, v, w))
+
+        heap = Heap(edges, Heap.less, key=lambda e: e[2])
+        while heap.size() > 0:
+            yield heap.delMin()
 
     def weight(self):
         return self.w
@@ -61,3 +182,88 @@ if __name__ == "__main__":
     mst = KruskalMST(graph)
 
     assert abs(10.46351 - mst.weight()) < 0.0001
+
+    from union_find import ArrayUnionFind
+
+    amst = KruskalMST(graph, ArrayUnionFind)
+    assert amst.weight() == mst.weight() and amst.mst == mst.mst
+
+    digraph = graph_utils.WeightedDigraph(3)
+    digraph.add_weighted_edges([0, 1, 2], [1, 2, 0], [1.0, 2.0, 3.0])
+    for mode in ('heap', 'filter'):
+        try:
+            KruskalMST(digraph, mode=mode)
+            assert False
+        except ValueError:
+            pass
+
+    # a disconnected graph never completes the tree, so every edge is scanned
+    forest = graph_utils.WeightedGraph(6)
+    forest.add_weighted_edges([0, 1, 0, 3, 4], [1, 2, 2, 4, 5], [1.0, 2.0, 3.0, 4.0, 5.0])
+    for mst in (KruskalMST(forest, ArrayUnionFind), KruskalMST.from_edge_arrays(6, [0, 1, 0, 3, 4], [1, 2, 2, 4, 5],
+                                                                                 [1.0, 2.0, 3.0, 4.0, 5.0])):
+        assert mst.weight() == 12.0 and len(mst.mst) == 4 and mst.edges_examined == 5
+
+    # the lazy stream against a full sort of both directions of every edge, on complete graphs
+    import random
+    import timeit
+
+    for n in (300, 1000):
+        rnd = random.Random(n)
+        us, vs, ws = [], [], []
+        for u in range(n):
+            for v in range(u + 1, n):
+                us.append(u)
+                vs.append(v)
+                ws.append(rnd.randint(1, 1000000))
+        graph = graph_utils.WeightedGraph(n)
+        graph.add_weighted_edges(us, vs, ws)
+
+        start = timeit.default_timer()
+        edges = sorted(((u, v, w) for u in range(n) for (v, w) in graph.edges(u)), key=lambda e: e[2])
+        uf = UnionFind(n)
+        weight = 0
+        for (u, v, w) in edges:
+            if not uf.connected(u, v):
+                uf.union(u, v)
+                weight += w
+        sort_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        mst = KruskalMST(graph, ArrayUnionFind)
+        stream_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        amst = KruskalMST.from_edge_arrays(n, us, vs, ws)
+        array_time = timeit.default_timer() - start
+
+        assert mst.weight() == amst.weight() == weight and len(mst.mst) == n - 1
+        print('complete graph %d: full sort %.2fs, edge stream %.2fs (%d of %d edges examined), '
+              'edge arrays %.2fs' % (n, sort_time, stream_time, mst.edges_examined, len(ws), array_time))
+
+    # filter-kruskal against the edge stream, on the clustering input and on complete graphs with
+    # distinct weights, whose tree is unique
+    def complete_graph(n, seed):
+        rnd = random.Random(seed)
+        pairs = [(u, v) for u in range(n) for v in range(u + 1, n)]
+        weights = rnd.sample(range(1, 10 * len(pairs)), len(pairs))
+        graph = graph_utils.WeightedGraph(n)
+        graph.add_weighted_edges([u for (u, _) in pairs], [v for (_, v) in pairs], weights)
+        return graph
+
+    for (name, graph, distinct) in (('clustering1', graph_utils.load_weighted_graph('../data/clustering1.txt', False), False),
+                                    ('complete 1000', complete_graph(1000, 1), True),
+                                    ('complete 2000', complete_graph(2000, 2), True)):
+        timings = []
+        results = []
+        for mode in ('heap', 'filter'):
+            start = timeit.default_timer()
+            results.append(KruskalMST(graph, ArrayUnionFind, mode, seed=1))
+            timings.append(timeit.default_timer() - start)
+
+        heap_mst, filter_mst = results
+        assert heap_mst.weight() == filter_mst.weight()
+        if distinct:
+            assert sorted(heap_mst.mst) == sorted(filter_mst.mst)
+        print('%s: weight %d, edge stream %.2fs, filter-kruskal %.2fs (%d of %d edges scanned)'
+              % (name, filter_mst.weight(), timings[0], timings[1], filter_mst.edges_examined, graph.E() // 2))
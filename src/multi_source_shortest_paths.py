@@ -0,0 +1,109 @@
+"""
+Shortest path distances from many sources on the same weighted digraph, computed on a pool of processes.
+
+Passing the graph to every worker by pickling it would copy the whole adjacency structure into each
+process. Instead the graph is written once as a binary snapshot (see graph_snapshot) and every worker
+maps the snapshot, its arrays are views over the mapping rather than copies, so all the workers share
+the same physical pages. Each worker keeps a single DijkstraSolver for all the sources it processes.
+
+The distances of each source are returned as an array of doubles, which pickles to a flat buffer of
+8 bytes per vertex, and the results are streamed back in the order they complete.
+
+    for source, distances in many_sources(graph, sources, workers=4):
+        ...
+"""
+
+from array import array
+import multiprocessing
+import os
+import tempfile
+
+from dijkstra import DijkstraSolver
+from graph_snapshot import save_binary, load_binary, is_mapped
+
+# the solver of each worker process, created once by the pool initializer
+_worker_solver = None
+
+
+def _init_worker(snapshot_path):
+    global _worker_solver
+    _worker_solver = DijkstraSolver(load_binary(snapshot_path, mmap=True))
+
+
+def _worker_is_mapped(_):
+    return is_mapped(_worker_solver.graph)
+
+
+def _solve(source):
+    _worker_solver.query(source)
+    return source, array('d', _worker_solver.distances)
+
+
+def many_sources(graph, sources, workers=None, snapshot_path=None, chunk_size=4):
+    """
+    Yields (source, distances) pairs for each of the sources, in completion order. The graph is
+    shared through the snapshot at snapshot_path, which is created in a temporary directory and
+    removed afterwards unless given.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        solver = DijkstraSolver(graph)
+        for source in sources:
+            solver.query(source)
+            yield source, array('d', solver.distances)
+        return
+
+    owns_snapshot = snapshot_path is None
+    if owns_snapshot:
+        snapshot_path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+        save_binary(graph, snapshot_path)
+
+    pool = multiprocessing.Pool(workers, _init_worker, (snapshot_path,))
+    try:
+        for result in pool.imap_unordered(_solve, sources, chunk_size):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        if owns_snapshot:
+            os.remove(snapshot_path)
+            os.rmdir(os.path.dirname(snapshot_path))
+
+
+if __name__ == "__main__":
+    import timeit
+
+    import graph_utils
+
+    graph = graph_utils.grid_weighted_digraph(60, 60, seed=1)
+    sources = list(range(0, graph.V(), graph.V() // 32))
+
+    # the workers see the graph through views of the mapped snapshot, not through private copies
+    snapshot_path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+    save_binary(graph, snapshot_path)
+    pool = multiprocessing.Pool(2, _init_worker, (snapshot_path,))
+    try:
+        assert all(pool.map(_worker_is_mapped, range(8)))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        os.remove(snapshot_path)
+        os.rmdir(os.path.dirname(snapshot_path))
+
+    expected = None
+    base_time = None
+    for workers in (1, 2, 4):
+        start = timeit.default_timer()
+        results = dict(many_sources(graph, sources, workers=workers))
+        elapsed = timeit.default_timer() - start
+
+        if expected is None:
+            expected, base_time = results, elapsed
+        assert results == expected
+
+        print('%d workers: %.2fs, %.2fx speedup on %d cores'
+              % (workers, elapsed, base_time / elapsed, multiprocessing.cpu_count()))
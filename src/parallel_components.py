@@ -0,0 +1,166 @@
+"""
+Connected components of an edge list file computed by a pool of processes.
+
+The file has the format of mediumUF.txt, the number of elements on the first line followed by one
+"p q" pair per line. It is cut into byte ranges of about chunk_size bytes, by default one range per
+worker, and each range is handed to a worker process. A line belongs to the range in which it starts,
+so a worker skips the partial line at the start of its range and reads past its end to complete the
+last line.
+
+Each worker unions the pairs of its range in a local ArrayUnionFind and returns the root of every
+element that its pairs touched, as two arrays of elements and roots and only for the elements that
+are not their own root. Connectivity within the range is captured by linking each element to its
+local root, so the driver obtains the global components by unioning these (element, root) pairs
+into a union-find of its own as the results arrive. The number of pairs a worker returns is bounded
+by the number of distinct elements in its range rather than by the number of lines, and the driver
+does less work the fewer the ranges are.
+
+    components = ParallelConnectedComponents('../data/mediumUF.txt', workers=4)
+    components.count_components()
+    components.component(p)
+"""
+
+from array import array
+import multiprocessing
+import os
+
+from union_find import ArrayUnionFind
+
+
+def _read_range(path, start, end):
+    """
+    Returns the lines starting within the byte range [start, end) of the file as a single string.
+    """
+    with open(path, 'rb') as f:
+        skip_partial = False
+        if start > 0:
+            f.seek(start - 1)
+            skip_partial = f.read(1) != b'\n'
+
+        data = f.read(end - start)
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+
+    if skip_partial:
+        newline = data.find(b'\n')
+        data = data[newline + 1:] if newline >= 0 else b''
+    return data
+
+
+def _local_roots(args):
+    """
+    Unions the pairs of a byte range and returns the (elements, roots) arrays of its elements.
+    """
+    path, num_elements, start, end = args
+    tokens = _read_range(path, start, end).split()
+    ps = array('i', map(int, tokens[0::2]))
+    qs = array('i', map(int, tokens[1::2]))
+
+    uf = ArrayUnionFind(num_elements)
+    uf.union_many(ps, qs)
+
+    elements, roots = array('i'), array('i')
+    find = uf.find
+    for p in set(ps) | set(qs):
+        root = find(p)
+        if root != p:
+            elements.append(p)
+            roots.append(root)
+    return elements, roots
+
+
+class ParallelConnectedComponents:
+    def __init__(self, path, workers=None, chunk_size=None):
+        self.path = path
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+
+        with open(path, 'rb') as f:
+            self.num_elements = int(f.readline())
+            data_start = f.tell()
+        size = os.path.getsize(path)
+
+        if chunk_size is None:
+            chunk_size = max(1, -(-(size - data_start) // self.workers))
+        self.chunk_size = chunk_size
+
+        self.ranges = [(path, self.num_elements, start, min(start + chunk_size, size))
+                       for start in range(data_start, size, chunk_size)]
+
+        self.uf = ArrayUnionFind(self.num_elements)
+        self._merge()
+
+        # the label of each element is the root of its component in the driver's union-find
+        self.labels = self.uf.find_many(range(self.num_elements))
+
+    def _merge(self):
+        if self.workers <= 1:
+            for r in self.ranges:
+                self.uf.union_many(*_local_roots(r))
+            return
+
+        pool = multiprocessing.Pool(self.workers)
+        try:
+            for (elements, roots) in pool.imap_unordered(_local_roots, self.ranges):
+                self.uf.union_many(elements, roots)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def count_components(self):
+        return self.uf.count_components()
+
+    def component(self, p):
+        return self.labels[p]
+
+    def connected(self, p, q):
+        return self.labels[p] == self.labels[q]
+
+
+if __name__ == "__main__":
+    import random
+    import shutil
+    import tempfile
+    import timeit
+
+    from union_find import UnionFind
+
+    def sequential(path):
+        with open(path, 'r') as input_file:
+            uf = UnionFind(int(input_file.readline()))
+            for ln in input_file:
+                p, q = [int(x) for x in ln.split()]
+                uf.union(p, q)
+        return uf
+
+    uf = sequential('../data/mediumUF.txt')
+    for chunk_size in (64, 1000, None):
+        components = ParallelConnectedComponents('../data/mediumUF.txt', workers=2, chunk_size=chunk_size)
+        assert components.count_components() == uf.count_components()
+        assert all(components.connected(p, q) == uf.connected(p, q) for p in range(0, 625, 7) for q in range(625))
+
+    # a scaled up input with a few large components
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'largeUF.txt')
+        rnd = random.Random(1)
+        N = 500000
+        with open(path, 'w') as f:
+            f.write('%d\n' % N)
+            for _ in range(1000000):
+                p = rnd.randrange(N)
+                f.write('%d %d\n' % (p, min(N - 1, p + rnd.randrange(1, 50))))
+
+        start = timeit.default_timer()
+        uf = sequential(path)
+        print('UnionFind: %d components, %.2fs' % (uf.count_components(), timeit.default_timer() - start))
+
+        for workers in (1, 2, 4):
+            start = timeit.default_timer()
+            components = ParallelConnectedComponents(path, workers=workers)
+            elapsed = timeit.default_timer() - start
+            assert components.count_components() == uf.count_components()
+            print('%d workers: %d components, %.2fs, %d cores'
+                  % (workers, components.count_components(), elapsed, multiprocessing.cpu_count()))
+    finally:
+        shutil.rmtree(directory)
@@ -20,26 +20,83 @@ of the algorithm reduces the time to O(MlogN)
 
 With N,M being the number of vertices and edges, respectively.
 
+The queue is a binary heap by default and can be replaced by any of the indexed queues accepted by
+priority_queue.make_queue whose keys need not be monotone, such as a d-ary heap ('4-ary') or a pairing
+heap ('pairing'). On dense graphs most edge scans end in a decrease-key, which the pairing heap
+performs in constant time.
+
+On dense graphs, such as the complete graphs of point clouds, the queue is not worth its cost.
+The dense strategy keeps the distance of every vertex to the tree in an array and selects the
+next vertex with a linear scan, which is O(V^2) overall, without any queue operations. With NumPy
+the weights are laid out in a V x V matrix, the scan is a single argmin and each relaxation a
+single vectorised comparison against a row of the matrix. The matrix is filled from flat arrays
+of the edges with a single numpy.minimum.at call, which keeps the lightest of parallel edges. The
+strategy is selected automatically from the density E/V^2, except that with NumPy a matrix larger
+than DENSE_MAX_BYTES falls back to the sparse strategy, and both strategies record the edges of the
+tree along with its weight.
+
 """
 from graph_utils import *
-import priority_queue
+from priority_queue import make_queue, INFINITY
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class PrimMST:
-    def __init__(self, graph):
+    # the density E/V^2 from which the dense strategy is chosen, E counts both directions of an edge
+    DENSE_RATIO = 0.02
+
+    # the largest V x V matrix of float64 weights that the automatic choice of the dense strategy
+    # allocates, 256MB or about 5800 vertices
+    DENSE_MAX_BYTES = 2 ** 28
+
+    def __init__(self, graph, queue='binary', strategy='auto'):
+        # the keys of Prim's queue are edge weights, they do not grow like Dijkstra's distances
+        if queue in ('dial', 'radix'):
+            raise ValueError("the %s queue requires monotone keys" % queue)
+        if strategy not in ('auto', 'dense', 'sparse'):
+            raise ValueError("unknown strategy %s" % strategy)
+
         self.graph = graph
+        self.queue = queue
         self.mst_weight = 0
-        self.mst()
+
+        # the edges of the tree as (parent, vertex) pairs, in the order they were added
+        self.mst_edges = []
+
+        if strategy == 'auto':
+            V = graph.V()
+            dense = V > 0 and graph.E() >= PrimMST.DENSE_RATIO * V * V
+            if numpy is not None and 8 * V * V > PrimMST.DENSE_MAX_BYTES:
+                dense = False
+            strategy = 'dense' if dense else 'sparse'
+        self.strategy = strategy
+
+        if graph.V() == 0:
+            return
+        if strategy == 'dense':
+            if numpy is not None:
+                self.dense_mst_numpy()
+            else:
+                self.dense_mst()
+        else:
+            self.mst()
 
     def mst(self):
         source = 0
         processed = {source}
         remaining = set([i for i in range(0, self.graph.V()) if i != source])
+        parent = [None for _ in range(self.graph.V())]
 
-        pq = priority_queue.IndexedPriorityQueue(graph.V())
+        pq = make_queue(self.queue, self.graph)
 
         for (vtx, weight) in self.graph.edges(source):
-            pq.insert(vtx, weight)
+            if not pq.contains(vtx) or pq.key_of(vtx) > weight:
+                pq.insert(vtx, weight)
+                parent[vtx] = source
 
         while len(remaining) > 0 and pq.size() > 0:
             v, w = pq.del_min()
@@ -47,6 +104,7 @@ class PrimMST:
             if v not in processed and v in remaining:
                 # print 'Adding ', v, ' weight ', w
                 self.mst_weight += w
+                self.mst_edges.append((parent[v], v))
                 processed.add(v)
                 remaining.remove(v)
 
@@ -54,20 +112,144 @@ class PrimMST:
                     if vtx not in processed:
                         if not pq.contains(vtx):
                             pq.insert(vtx, weight)
+                            parent[vtx] = v
                         elif pq.key_of(vtx) > weight:
                             pq.decrease(vtx, weight)
+                            parent[vtx] = v
 
+    def dense_mst(self):
+        """
+        Prim's algorithm without a queue, the closest vertex is found by scanning all the vertices
+        that are not in the tree yet.
+        """
+        source = 0
+        distance = [INFINITY for _ in range(self.graph.V())]
+        parent = [None for _ in range(self.graph.V())]
+        remaining = set(range(self.graph.V()))
+        distance[source] = 0
+
+        closest = distance.__getitem__
+        while remaining:
+            v = min(remaining, key=closest)
+            if distance[v] == INFINITY:
+                # the rest of the vertices are not connected to the tree
+                break
+
+            remaining.remove(v)
+            if parent[v] is not None:
+                self.mst_weight += distance[v]
+                self.mst_edges.append((parent[v], v))
+
+            for (vtx, weight) in self.graph.edges(v):
+                if weight < distance[vtx] and vtx in remaining:
+                    distance[vtx] = weight
+                    parent[vtx] = v
+
+    def dense_mst_numpy(self):
+        n = self.graph.V()
+        if n == 0:
+            return
+
+        # the edges as flat arrays of matrix positions and weights
+        adjacency = [self.graph.edges(v) for v in range(n)]
+        sources = numpy.repeat(numpy.arange(n, dtype=numpy.int64), [len(edges) for edges in adjacency])
+        targets = numpy.array([vtx for edges in adjacency for (vtx, _) in edges], dtype=numpy.int64)
+        edge_weights = numpy.array([weight for edges in adjacency for (_, weight) in edges], dtype=numpy.float64)
+
+        weights = numpy.full(n * n, numpy.inf)
+        numpy.minimum.at(weights, sources * n + targets, edge_weights)
+        weights = weights.reshape(n, n)
+
+        source = 0
+        distance = weights[source].copy()
+        parent = numpy.zeros(n, dtype=numpy.int64)
+        in_tree = numpy.zeros(n, dtype=bool)
+        in_tree[source] = True
+        distance[source] = numpy.inf
+
+        for _ in range(n - 1):
+            v = int(distance.argmin())
+            if distance[v] == numpy.inf:
+                break
+
+            self.mst_weight += distance[v].item()
+            self.mst_edges.append((int(parent[v]), v))
+            in_tree[v] = True
+
+            # the vertices of the tree stay at infinity so that argmin never picks them again
+            closer = (weights[v] < distance) & ~in_tree
+            distance[closer] = weights[v][closer]
+            parent[closer] = v
+            distance[v] = numpy.inf
 
     def weight(self):
         return self.mst_weight
 
+    def edges(self):
+        return self.mst_edges
+
 if __name__ == "__main__":
     graph = load_weighted_graph('../data/tinyEWG.txt', True)
     mst = PrimMST(graph)
     print mst.weight()
     assert 1.81 == mst.weight()
 
-    graph = load_weighted_graph('../data2.txt', False)
-    mst = PrimMST(graph)
-    print mst.weight()
-
+    for strategy in ('auto', 'dense', 'sparse'):
+        empty = PrimMST(WeightedGraph(0), strategy=strategy)
+        assert empty.weight() == 0 and empty.edges() == []
+    assert PrimMST(WeightedGraph(0)).strategy == 'sparse'
+
+    import random
+    import timeit
+
+    # the pairing heap against the binary and d-ary heaps on sparse and dense graphs
+    dense = WeightedGraph(1000)
+    rnd = random.Random(1)
+    for u in range(1000):
+        for v in range(u + 1, 1000):
+            if rnd.random() < 0.4:
+                dense.add_weighted_edge(u, v, rnd.randint(1, 1000))
+
+    for (name, graph) in (('floyd-warshall-1000', load_weighted_graph('../data/floyd-warshall-1000.txt', False)),
+                          ('mediumEWG', load_weighted_graph('../data/mediumEWG.txt')),
+                          ('dense 1000', dense)):
+        expected = None
+        for queue in ('binary', '4-ary', 'pairing'):
+            start = timeit.default_timer()
+            mst = PrimMST(graph, queue, 'sparse')
+            elapsed = timeit.default_timer() - start
+
+            if expected is None:
+                expected = mst.weight()
+            assert abs(mst.weight() - expected) < 1e-6
+            print('%s %s: weight %.2f, %.1f ms' % (name, queue, mst.weight(), 1000 * elapsed))
+
+
+    # the dense and sparse strategies against the density, the tree edges add up to the weight
+    from kruskal_mst import KruskalMST
+
+    points = [(rnd.random(), rnd.random()) for _ in range(800)]
+    cloud = WeightedGraph(len(points))
+    for u in range(len(points)):
+        for v in range(u + 1, len(points)):
+            cloud.add_weighted_edge(u, v, ((points[u][0] - points[v][0]) ** 2 + (points[u][1] - points[v][1]) ** 2) ** 0.5)
+
+    for (name, graph) in (('mediumEWG', load_weighted_graph('../data/mediumEWG.txt')),
+                          ('floyd-warshall-1000', load_weighted_graph('../data/floyd-warshall-1000.txt', False)),
+                          ('dense 1000', dense),
+                          ('point cloud 800', cloud)):
+        expected = KruskalMST(graph).weight()
+        timings = {}
+        for strategy in ('sparse', 'dense', 'auto'):
+            start = timeit.default_timer()
+            mst = PrimMST(graph, strategy=strategy)
+            timings[strategy] = timeit.default_timer() - start
+
+            weights = dict(((u, v), w) for u in range(graph.V()) for (v, w) in graph.edges(u))
+            assert abs(mst.weight() - expected) < 1e-6 and len(mst.edges()) == graph.V() - 1
+            assert abs(sum(min(w for (v, w) in graph.edges(u) if v == x) for (u, x) in mst.edges()) - expected) < 1e-6
+            assert all((u, v) in weights for (u, v) in mst.edges())
+
+        print('%s, E/V^2 %.3f: sparse %.1f ms, dense %.1f ms, auto picks %s'
+              % (name, graph.E() / float(graph.V() ** 2), 1000 * timings['sparse'], 1000 * timings['dense'],
+                 mst.strategy))
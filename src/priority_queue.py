@@ -1,7 +1,15 @@
 """
 A minimum priority queue which allows clients to associate an integer with each key.
+
+make_queue creates one of the indexed queues by name, for the searches of Dijkstra's and Prim's
+algorithms on a graph.
 """
 
+from array import array
+
+
+INFINITY = 1e1000
+
 
 class IndexedPriorityQueue:
     def __init__(self, maxItems):
@@ -109,7 +117,517 @@ class IndexedPriorityQueue:
         return self.N == 0
 
     def contains(self, index):
-        return index in self.heap
+        return self.index[index] != -1
+
+    def clear(self):
+        """
+        Removes all the queued items. Only the entries of the queued items are reset so the
+        cost is proportional to the size of the queue and not to maxItems.
+        """
+        for i in range(self.N):
+            index = self.heap[i]
+            self.keys[index] = None
+            self.index[index] = -1
+            self.heap[i] = None
+        self.N = 0
+
+
+class DaryIndexedPriorityQueue:
+    """
+    An indexed min priority queue backed by a d-ary heap, a drop-in replacement for IndexedPriorityQueue.
+
+    Every node of the heap has d children instead of 2, so the heap is log2(d) times shallower. A
+    decrease-key only swims towards the root and gets cheaper accordingly, while removing the minimum
+    sinks through fewer levels but compares d children per level. Searches such as Dijkstra's
+    algorithm, which perform many more decrease-key operations than removals, favour d = 4 or 8.
+
+    The heap and the position of each index are kept in arrays of machine integers, and swim and
+    sink move the displaced index into a hole instead of exchanging it at every level.
+    """
+
+    def __init__(self, maxItems, d=4):
+        assert d >= 2
+        self.maxItems = maxItems
+        self.d = d
+        self.N = 0
+
+        # the d-ary heap, contains indexes
+        self.heap = array('i', [0]) * maxItems
+
+        # maps from indexes to heap positions, -1 for the indexes which are not queued
+        self.index = array('i', [-1]) * maxItems
+
+        # maps from indexes to keys
+        self.keys = [None for _ in range(maxItems)]
+
+    def swim(self, i):
+        heap, index, keys, d = self.heap, self.index, self.keys, self.d
+        moving = heap[i]
+        key = keys[moving]
+        while i > 0:
+            p = (i - 1) // d
+            parent = heap[p]
+            if keys[parent] <= key:
+                break
+            heap[i] = parent
+            index[parent] = i
+            i = p
+        heap[i] = moving
+        index[moving] = i
+
+    def sink(self, i):
+        heap, index, keys, d, n = self.heap, self.index, self.keys, self.d, self.N
+        moving = heap[i]
+        key = keys[moving]
+        while True:
+            first = i * d + 1
+            if first >= n:
+                break
+            min_child, min_key = first, keys[heap[first]]
+            for c in range(first + 1, min(first + d, n)):
+                k = keys[heap[c]]
+                if k < min_key:
+                    min_child, min_key = c, k
+            if min_key >= key:
+                break
+            heap[i] = heap[min_child]
+            index[heap[i]] = i
+            i = min_child
+        heap[i] = moving
+        index[moving] = i
+
+    def insert(self, index, key):
+        if self.index[index] != -1:
+            if self.keys[index] < key:
+                self.increase(index, key)
+            else:
+                self.decrease(index, key)
+            return
+
+        assert self.N < self.maxItems
+        self.keys[index] = key
+        self.heap[self.N] = index
+        self.index[index] = self.N
+        self.N += 1
+        self.swim(self.N - 1)
+
+    def increase(self, index, key):
+        self.keys[index] = key
+        self.sink(self.index[index])
+
+    def decrease(self, index, key):
+        self.keys[index] = key
+        self.swim(self.index[index])
+
+    def del_min(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        min_index = self.heap[0]
+        k = self.keys[min_index]
+
+        self.N -= 1
+        self.heap[0] = self.heap[self.N]
+        self.keys[min_index] = None
+        self.index[min_index] = -1
+        if self.N > 0:
+            self.sink(0)
+
+        return (min_index, k)
+
+    def min_index(self):
+        return self.heap[0]
+
+    def min_key(self):
+        return self.keys[self.heap[0]]
+
+    def key_of(self, index):
+        assert self.contains(index)
+        return self.keys[index]
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
+
+    def contains(self, index):
+        return self.index[index] != -1
+
+    def clear(self):
+        for i in range(self.N):
+            index = self.heap[i]
+            self.keys[index] = None
+            self.index[index] = -1
+        self.N = 0
+
+
+class PairingHeap:
+    """
+    An indexed min priority queue backed by a pairing heap, a drop-in replacement for IndexedPriorityQueue.
+
+    A pairing heap is a heap-ordered multiway tree. Two trees are linked by making the root with the
+    larger key the first child of the other root, which is all that insert and decrease-key need:
+    insert links a single node tree with the root, decrease-key cuts the subtree of the node from its
+    parent and links it with the root. Both take O(1) time. Removing the minimum discards the root and
+    rebuilds a tree from its children in two passes, linking them in pairs from left to right and then
+    linking the results from right to left, in O(log N) amortized time.
+
+    Since decrease-key does not move anything along a path, the heap suits searches on dense graphs
+    which perform many more decrease-key operations than removals.
+
+    The nodes are the indexes themselves, with the tree links kept in arrays: the first child, the next
+    sibling and the previous node, which is the left sibling or the parent for a first child.
+    """
+
+    def __init__(self, maxItems):
+        self.maxItems = maxItems
+        self.N = 0
+        self.root = -1
+
+        self.child = [-1 for _ in range(maxItems)]
+        self.sibling = [-1 for _ in range(maxItems)]
+        self.prev = [-1 for _ in range(maxItems)]
+
+        # maps from indexes to keys
+        self.keys = [None for _ in range(maxItems)]
+
+    def _link(self, a, b):
+        """
+        Links the trees rooted at a and b and returns the root of the result.
+        """
+        keys = self.keys
+        if keys[b] < keys[a]:
+            a, b = b, a
+
+        first = self.child[a]
+        self.sibling[b] = first
+        if first != -1:
+            self.prev[first] = b
+        self.prev[b] = a
+        self.child[a] = b
+        return a
+
+    def _cut(self, i):
+        """
+        Detaches the subtree rooted at i from its parent.
+        """
+        p, s = self.prev[i], self.sibling[i]
+        if self.child[p] == i:
+            self.child[p] = s
+        else:
+            self.sibling[p] = s
+        if s != -1:
+            self.prev[s] = p
+        self.prev[i] = self.sibling[i] = -1
+
+    def _merge_pairs(self, first):
+        """
+        Combines the sibling list starting at first into a single tree and returns its root.
+        """
+        trees = []
+        while first != -1:
+            next_sibling = self.sibling[first]
+            self.prev[first] = self.sibling[first] = -1
+            trees.append(first)
+            first = next_sibling
+
+        if not trees:
+            return -1
+
+        paired = [self._link(trees[i], trees[i + 1]) if i + 1 < len(trees) else trees[i]
+                  for i in range(0, len(trees), 2)]
+        root = paired.pop()
+        while paired:
+            root = self._link(paired.pop(), root)
+        return root
+
+    def insert(self, index, key):
+        if self.keys[index] is not None:
+            if self.keys[index] < key:
+                self.increase(index, key)
+            else:
+                self.decrease(index, key)
+            return
+
+        assert self.N < self.maxItems
+        self.keys[index] = key
+        self.N += 1
+        self.root = index if self.root == -1 else self._link(self.root, index)
+
+    def decrease(self, index, key):
+        self.keys[index] = key
+        if index != self.root:
+            self._cut(index)
+            self.root = self._link(self.root, index)
+
+    def increase(self, index, key):
+        # the children of the node may now violate the heap order, they are merged back separately
+        if index == self.root:
+            self.root = self._merge_pairs(self.child[index])
+        else:
+            self._cut(index)
+            subtree = self._merge_pairs(self.child[index])
+            if subtree != -1:
+                self.root = self._link(self.root, subtree)
+        self.child[index] = -1
+
+        self.keys[index] = key
+        self.root = index if self.root == -1 else self._link(self.root, index)
+
+    def del_min(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        min_index = self.root
+        k = self.keys[min_index]
+
+        self.root = self._merge_pairs(self.child[min_index])
+        self.child[min_index] = -1
+        self.keys[min_index] = None
+        self.N -= 1
+
+        return (min_index, k)
+
+    def min_index(self):
+        return self.root
+
+    def min_key(self):
+        return self.keys[self.root]
+
+    def key_of(self, index):
+        assert self.contains(index)
+        return self.keys[index]
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
+
+    def contains(self, index):
+        return self.keys[index] is not None
+
+    def clear(self):
+        stack = [self.root] if self.root != -1 else []
+        while stack:
+            i = stack.pop()
+            c = self.child[i]
+            while c != -1:
+                stack.append(c)
+                c = self.sibling[c]
+            self.child[i] = self.sibling[i] = self.prev[i] = -1
+            self.keys[i] = None
+        self.root = -1
+        self.N = 0
+
+
+class DialQueue:
+    """
+    A monotone indexed min priority queue for non-negative integer keys, also known as Dial's buckets.
+
+    When the keys are integers and no key exceeds the last removed minimum by more than max_step, as
+    is the case in Dijkstra's algorithm with integer weights up to max_step, all the queued keys lie
+    in a window of max_step + 1 consecutive values. The queue keeps one bucket per value of the
+    window in a circular array and removes the minimum by advancing a cursor to the next non-empty
+    bucket. Insertions and decrease-key operations move an index between buckets in O(1) and
+    removing the minimum takes O(max_step) in the worst case.
+    """
+
+    def __init__(self, maxItems, max_step):
+        self.maxItems = maxItems
+        self.N = 0
+        self.num_buckets = int(max_step) + 1
+        self.buckets = [set() for _ in range(self.num_buckets)]
+
+        # the key of the last removed minimum, the keys of the queued indexes are not smaller
+        self.current = 0
+
+        # maps from indexes to keys
+        self.keys = [None for _ in range(maxItems)]
+
+    def _bucket(self, key):
+        return self.buckets[int(key) % self.num_buckets]
+
+    def insert(self, index, key):
+        if self.keys[index] is not None:
+            self._bucket(self.keys[index]).discard(index)
+        else:
+            self.N += 1
+
+        self.keys[index] = key
+        self._bucket(key).add(index)
+
+    def decrease(self, index, key):
+        self.insert(index, key)
+
+    def del_min(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        while not self.buckets[self.current % self.num_buckets]:
+            self.current += 1
+
+        index = self.buckets[self.current % self.num_buckets].pop()
+        key = self.keys[index]
+        self.keys[index] = None
+        self.N -= 1
+        return (index, key)
+
+    def min_key(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        while not self.buckets[self.current % self.num_buckets]:
+            self.current += 1
+        return self.keys[next(iter(self.buckets[self.current % self.num_buckets]))]
+
+    def key_of(self, index):
+        assert self.contains(index)
+        return self.keys[index]
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
+
+    def contains(self, index):
+        return self.keys[index] is not None
+
+    def clear(self):
+        for bucket in self.buckets:
+            for index in bucket:
+                self.keys[index] = None
+            bucket.clear()
+        self.N = 0
+        self.current = 0
+
+
+class RadixHeap:
+    """
+    A monotone indexed min priority queue for non-negative integer keys of any magnitude.
+
+    The keys are grouped in buckets by the position of the highest bit in which they differ from
+    the last removed minimum: bucket 0 holds the keys equal to it and bucket i the keys whose highest
+    differing bit is bit i - 1. Since the keys of a monotone queue never drop below the last minimum,
+    the keys of bucket i are all smaller than those of bucket i + 1. Removing the minimum from an
+    empty bucket 0 finds the first non-empty bucket, makes its smallest key the new reference and
+    redistributes its keys, which then land in strictly lower buckets. Each key moves down at most
+    once per bit, giving O(log C) amortized time per removal where C is the largest key difference,
+    while insertions and decrease-key operations take O(1).
+    """
+
+    NUM_BUCKETS = 65
+
+    def __init__(self, maxItems):
+        self.maxItems = maxItems
+        self.N = 0
+        self.buckets = [set() for _ in range(RadixHeap.NUM_BUCKETS)]
+        self.last = 0
+
+        # maps from indexes to keys and to the buckets holding them
+        self.keys = [None for _ in range(maxItems)]
+        self.bucket_of = [-1 for _ in range(maxItems)]
+
+    def _place(self, index, key):
+        b = (int(key) ^ int(self.last)).bit_length()
+        self.buckets[b].add(index)
+        self.bucket_of[index] = b
+
+    def insert(self, index, key):
+        if self.keys[index] is not None:
+            self.buckets[self.bucket_of[index]].discard(index)
+        else:
+            self.N += 1
+
+        self.keys[index] = key
+        self._place(index, key)
+
+    def decrease(self, index, key):
+        self.insert(index, key)
+
+    def _refill(self):
+        if self.buckets[0]:
+            return
+
+        b = 1
+        while not self.buckets[b]:
+            b += 1
+
+        bucket = self.buckets[b]
+        self.buckets[b] = set()
+        self.last = min(self.keys[i] for i in bucket)
+        for i in bucket:
+            self._place(i, self.keys[i])
+
+    def del_min(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        self._refill()
+        index = self.buckets[0].pop()
+        key = self.keys[index]
+        self.keys[index] = None
+        self.bucket_of[index] = -1
+        self.N -= 1
+        return (index, key)
+
+    def min_key(self):
+        if self.N == 0:
+            raise Exception("Queue is empty")
+
+        self._refill()
+        return self.last
+
+    def key_of(self, index):
+        assert self.contains(index)
+        return self.keys[index]
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
+
+    def contains(self, index):
+        return self.keys[index] is not None
+
+    def clear(self):
+        for bucket in self.buckets:
+            for index in bucket:
+                self.keys[index] = None
+                self.bucket_of[index] = -1
+            bucket.clear()
+        self.N = 0
+        self.last = 0
+
+
+def make_queue(queue, graph):
+    """
+    Creates the indexed priority queue named by queue for a search on graph. The monotone queues
+    require non-negative integer weights and the dial queue is sized by the largest weight.
+    """
+    if queue == 'binary':
+        return IndexedPriorityQueue(graph.V())
+    if queue.endswith('-ary') and queue[:-4].isdigit():
+        return DaryIndexedPriorityQueue(graph.V(), int(queue[:-4]))
+    if queue == 'pairing':
+        return PairingHeap(graph.V())
+    if queue not in ('dial', 'radix'):
+        raise ValueError("unknown queue %s" % queue)
+
+    max_weight = 0
+    for v in range(graph.V()):
+        for (_, weight) in graph.edges(v):
+            if weight < 0 or weight != int(weight):
+                raise ValueError("the %s queue requires non-negative integer weights" % queue)
+            if weight > max_weight:
+                max_weight = weight
+
+    if queue == 'dial':
+        return DialQueue(graph.V(), max_weight)
+    return RadixHeap(graph.V())
 
 
 class PriorityQueue:
@@ -148,11 +666,22 @@ class PriorityQueue:
 
         for i in range(1, 11):
             assert pq.del_min() == i
+
+    Validating the heap order walks the whole heap, which turns every operation into an O(N) one.
+    It is off by default and can be turned on per queue while debugging:
+
+        pq = PriorityQueue(10, validate=True)
+
+    Batches of keys are added with insert_many and removed with pop_many, and meld moves all the
+    items of another queue into this one. A batch that is large compared to the queue is appended
+    as a whole and the heap order is restored once, bottom-up, in O(N) time instead of swimming
+    every key in O(logN).
     """
 
-    def __init__(self, maxItems):
+    def __init__(self, maxItems, validate=False):
         self.maxItems = maxItems
         self.N = 0
+        self.validate = validate
 
         # the binary heap, contains indexes
         self.heap = [None for _ in range(maxItems)]
@@ -161,18 +690,30 @@ class PriorityQueue:
         self.values = {}
 
     @staticmethod
-    def heapify(arr):
-        pq = PriorityQueue(len(arr))
+    def heapify(arr, validate=False):
+        pq = PriorityQueue(len(arr), validate)
         pq.heap = [x for x in arr]
         pq.N = len(arr)
-
-        for i in range(pq.N / 2, -1, -1):
-            pq.sink(i)
+        pq._restore_order()
 
         for x in pq.heap:
             pq.values[x] = x
         return pq
 
+    def _restore_order(self):
+        for i in range(self.N // 2, -1, -1):
+            self.sink(i)
+        self._check()
+
+    def _check(self):
+        if self.validate:
+            assert self._is_minpq(0)
+
+    def _reserve(self, n):
+        if n > self.maxItems:
+            self.heap.extend([None for _ in range(n - self.maxItems)])
+            self.maxItems = n
+
     @staticmethod
     def _left_child(i):
         return 1 + i * 2
@@ -225,7 +766,10 @@ class PriorityQueue:
                 return
 
     def insert(self, key, val=None):
-        assert self.N <= self.maxItems
+        """
+        Inserts the key with the value val, or replaces the value of a queued key. The queue grows
+        when it is full, like with insert_many.
+        """
         if val is None:
             val = key
 
@@ -233,11 +777,73 @@ class PriorityQueue:
             self.values[key] = val
         else:
             self.values[key] = val
+            self._reserve(self.N + 1)
             self.heap[self.N] = key
             self.N += 1
             self.swim(self.N - 1)
 
-        assert self._is_minpq(0)
+        self._check()
+
+    def insert_many(self, keys, vals=None):
+        """
+        Inserts the keys, with the values vals if given, like repeated calls to insert. The queue
+        grows when the keys do not fit.
+        """
+        keys = list(keys)
+        vals = keys if vals is None else list(vals)
+        assert len(keys) == len(vals)
+
+        start = self.N
+        self._reserve(self.N + len(keys))
+        for (key, val) in zip(keys, vals):
+            if key not in self.values:
+                self.heap[self.N] = key
+                self.N += 1
+            self.values[key] = val
+
+        added = self.N - start
+        if added > start:
+            self._restore_order()
+        else:
+            for i in range(start, self.N):
+                self.swim(i)
+            self._check()
+
+    def pop_many(self, k):
+        """
+        Removes the k smallest keys, or all the keys if there are fewer, and returns their values in
+        ascending order of key.
+        """
+        k = min(k, self.N)
+        if k == self.N:
+            # emptying the queue is a plain sort
+            keys = sorted(self.heap[:self.N])
+            for i in range(self.N):
+                self.heap[i] = None
+            self.N = 0
+        else:
+            keys = []
+            for _ in range(k):
+                keys.append(self.heap[0])
+                self.N -= 1
+                self.heap[0] = self.heap[self.N]
+                self.heap[self.N] = None
+                self.sink(0)
+            self._check()
+
+        return [self.values.pop(key) for key in keys]
+
+    def meld(self, other):
+        """
+        Moves all the items of the queue other into this queue, leaving other empty.
+        """
+        keys = other.heap[:other.N]
+        self.insert_many(keys, [other.values[key] for key in keys])
+
+        for i in range(other.N):
+            other.heap[i] = None
+        other.N = 0
+        other.values = {}
 
     def del_min(self):
         if self.N == 0:
@@ -256,7 +862,7 @@ class PriorityQueue:
 
         self.sink(0)
 
-        assert self._is_minpq(0)
+        self._check()
 
         return v
 
@@ -345,6 +951,45 @@ if __name__ == "__main__":
         assert cmp1
         assert cmp2
 
+    for pq in [DaryIndexedPriorityQueue(N, d) for d in (2, 4, 8)] + [PairingHeap(N)]:
+        keys = list(range(N))
+        random.shuffle(keys)
+        for (i, k) in enumerate(keys):
+            pq.insert(i, k + N)
+        for i in range(0, N, 3):
+            pq.decrease(i, pq.key_of(i) - N)
+        for i in range(1, N, 7):
+            pq.increase(i, pq.key_of(i) + N)
+        assert pq.contains(0) and not DaryIndexedPriorityQueue(N).contains(0)
+
+        expected = sorted(pq.key_of(i) for i in range(N))
+        assert [pq.del_min()[1] for _ in range(N)] == expected
+        assert pq.is_empty() and not pq.contains(0)
+
+        pq.insert(3, 1.0)
+        pq.insert(5, 2.0)
+        pq.clear()
+        assert pq.is_empty() and not pq.contains(3)
+
+    for pq in (DialQueue(10, 5), RadixHeap(10)):
+        pq.insert(0, 3)
+        pq.insert(1, 5)
+        pq.insert(2, 4)
+        pq.decrease(1, 3)
+        assert pq.size() == 3 and pq.min_key() == 3
+        assert pq.del_min()[1] == 3
+        pq.insert(3, 8)
+        assert pq.del_min()[1] == 3
+        assert pq.del_min() == (2, 4)
+        assert pq.del_min() == (3, 8)
+        assert pq.is_empty()
+        for empty_op in (pq.min_key, pq.del_min):
+            try:
+                empty_op()
+                assert False
+            except Exception as e:
+                assert str(e) == "Queue is empty"
+
     pq = PriorityQueue(10)
 
     pq.insert(1000.0, "!")
@@ -367,5 +1012,37 @@ if __name__ == "__main__":
     for i in range(1, 11):
         assert pq.del_min() == i
 
+    pq = PriorityQueue(4, validate=True)
+    pq.insert_many([5, 3, 9])
+    pq.insert_many(range(20, 0, -1), ["v%d" % i for i in range(20, 0, -1)])
+    assert pq.size() == 20 and pq.pop_many(3) == ["v1", "v2", "v3"]
+
+    other = PriorityQueue.heapify([0.5, 100])
+    pq.meld(other)
+    assert other.is_empty() and pq.size() == 19
+    assert pq.pop_many(2) == [0.5, "v4"]
+    assert pq.pop_many(100) == ["v%d" % i for i in range(5, 21)] + [100]
+    assert pq.is_empty()
+
+    # single and batch inserts grow a full queue alike
+    pq = PriorityQueue(2)
+    pq.insert_many([4, 2, 6])
+    pq.insert(1)
+    pq.insert(3)
+    assert pq.size() == 5 and pq.pop_many(5) == [1, 2, 3, 4, 6]
+
+    # the construction of a Huffman trie, with and without validation
+    import timeit
+
+    for n in (500, 2000):
+        for validate in (True, False):
+            freqs = [random.randint(1, 1000000) + random.random() for _ in range(n)]
+            start = timeit.default_timer()
+            queue = PriorityQueue.heapify(freqs, validate)
+            while queue.size() > 1:
+                x, y = queue.pop_many(2)
+                queue.insert(x + y)
+            print('%d symbols, validate=%s: %.1f ms' % (n, validate, 1000 * (timeit.default_timer() - start)))
+
 
 
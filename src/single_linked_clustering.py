@@ -13,6 +13,10 @@ step of the algorithm we pick the next edge with the minimum weight. If the vert
 to that edge are not in the same cluster, we merge their clusters into a single one.
 
 We repeat the above process until we end up with k clusters, where k is a user provided parameter.
+
+The merging runs as a single union_many call that stops at k components. The spacing is then the
+weight of the first remaining edge whose endpoints fall in different clusters, found by comparing
+the roots that find_many returns for all the remaining edges at once.
 """
 
 import graph_utils
@@ -20,30 +24,34 @@ from union_find import UnionFind
 
 class SingleLinkedClustering:
 
-    def __init__(self, k, graph):
+    def __init__(self, k, graph, union_find=UnionFind):
         self.graph = graph
         self.k = k
+        self.union_find = union_find
         self.spacing = 1e100
         self.__cluster()
 
     def __cluster(self):
 
-        uf = UnionFind(self.graph.V())
+        uf = self.union_find(self.graph.V())
 
         min_spacing = 1e100
 
-        for edge in self.__sorted_edges():
-
-            u, v, w = edge
+        edges = self.__sorted_edges()
+        us = [u for (u, _, _) in edges]
+        vs = [v for (_, v, _) in edges]
 
-            if uf.count_components() > self.k and not uf.connected(u, v):
-                uf.union(u, v)
+        merged = uf.union_many(us, vs, self.k)
+        rest = merged[-1] + 1 if merged else 0
 
-            elif not uf.connected(u, v):
-                # once we have k clusters,
-                # examine each cross-clusters edge and pick the minimum
-                if min_spacing > w:
-                    min_spacing = w
+        # once we have k clusters, the edges are still sorted
+        # so the first cross-clusters edge is the minimum
+        u_roots = uf.find_many(us[rest:])
+        v_roots = uf.find_many(vs[rest:])
+        for i in range(len(u_roots)):
+            if u_roots[i] != v_roots[i]:
+                min_spacing = edges[rest + i][2]
+                break
 
         self.spacing = min_spacing
 
@@ -70,3 +78,7 @@ if __name__ == "__main__":
     slk = SingleLinkedClustering(4, graph)
 
     print slk.max_spacing()
+
+    from union_find import ArrayUnionFind
+
+    assert SingleLinkedClustering(4, graph, ArrayUnionFind).max_spacing() == slk.max_spacing()
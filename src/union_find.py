@@ -46,8 +46,41 @@ future Find operations on the same element, in the best case from logN down to 1
 
 It provides amortized constant time for both find and union operations.
 
+Both implementations offer union_many(ps, qs) and find_many(ps) which process whole arrays of elements
+in one call, for example the endpoints of all the edges of a graph. union_many returns the positions of
+the pairs that merged two components, which for edges sorted by weight are the edges of Kruskal's tree.
+
+UnionFind keeps its elements and ranks in Python lists, which take a pointer plus an integer object per
+entry, and checks its arguments on every call. ArrayUnionFind keeps them in an array of machine integers
+and an array of bytes, 5 bytes per element, checks the arguments once per batch, and halves the paths
+instead of compressing them, which needs a single pass. When NumPy is available find_many resolves a
+NumPy array of elements with vectorised pointer jumping over a view of the same array.
+
+RollbackUnionFind can undo its unions. It links by rank but does not compress paths, so a union only
+changes the parent of one root and possibly the rank of another, and it records these changes on a
+stack. snapshot() returns the current height of the stack and rollback(to) pops the changes above it,
+in time proportional to the number of undone unions. Without path compression find takes O(logN).
+
+KeyedUnionFind does not need the number of elements up front. Any hashable keys, such as string ids,
+are interned into consecutive integer ids by union and add and the arrays grow with them, while the
+queries treat an unknown key as a singleton without interning it. It links by size and keeps the
+sizes of the components, which answers the size of the component of a key and the largest component
+in O(1). The largest size is a running maximum, since a union never shrinks a component. The roots
+are also grouped in buckets by component size, kept in a dict in O(1) per union, and top_components
+sorts the distinct sizes only when it is called and walks them from the largest down without
+scanning the components. N elements form at most sqrt(2N) distinct sizes, so the sort costs
+O(sqrt(N) log N) per call.
+
 """
 
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 class UnionFind:
 
     def __init__(self, max_elements):
@@ -56,6 +89,9 @@ class UnionFind:
         self.elements = [i for i in range(self.N)]
         self.ranks = [1 for _ in range(self.N)]
 
+        # the number of pairs looked at by the last union_many call
+        self.last_scanned = 0
+
     def find(self, p):
         assert 0 <= p < self.N
 
@@ -67,6 +103,9 @@ class UnionFind:
         return p
 
     def union(self, p, q):
+        """
+        Connects p and q and returns whether they were in different components.
+        """
         assert 0 <= p < self.N
         assert 0 <= q < self.N
 
@@ -87,6 +126,9 @@ class UnionFind:
                     self.ranks[p_root] += 1
 
                 self.num_components -= 1
+                return True
+
+        return False
 
     def connected(self, p, q):
         return self.find(p) == self.find(q)
@@ -94,6 +136,352 @@ class UnionFind:
     def count_components(self):
         return self.num_components
 
+    def union_many(self, ps, qs, min_components=1):
+        """
+        Unions the pairs (ps[i], qs[i]) in order, stopping once min_components components remain,
+        and returns the positions i of the pairs that merged two components. The number of pairs
+        looked at before stopping is left in last_scanned.
+        """
+        merged = []
+        scanned = 0
+        for i in range(len(ps)):
+            if self.num_components <= min_components:
+                break
+            scanned += 1
+            if self.union(ps[i], qs[i]):
+                merged.append(i)
+        self.last_scanned = scanned
+        return merged
+
+    def find_many(self, ps):
+        return [self.find(p) for p in ps]
+
+
+class ArrayUnionFind:
+    """
+    A union-find over array('i') parents and array('B') ranks, a drop-in replacement for UnionFind
+    with faster batch operations.
+    """
+
+    def __init__(self, max_elements):
+        self.N = max_elements
+        self.num_components = self.N
+        self.elements = array('i', range(self.N))
+        self.ranks = array('B', [1]) * self.N
+
+        # the number of pairs looked at by the last union_many call
+        self.last_scanned = 0
+
+    def _check(self, ps):
+        if len(ps) > 0 and (min(ps) < 0 or max(ps) >= self.N):
+            raise IndexError("element out of range")
+
+    def find(self, p):
+        if p < 0:
+            raise IndexError("element out of range")
+
+        elements = self.elements
+        parent = elements[p]
+        while parent != p:
+            # path halving, every other element on the path is linked to its grandparent
+            grandparent = elements[parent]
+            elements[p] = grandparent
+            p, parent = grandparent, elements[grandparent]
+        return p
+
+    def union(self, p, q):
+        return self.union_many([p], [q]) != []
+
+    def connected(self, p, q):
+        return self.find(p) == self.find(q)
+
+    def count_components(self):
+        return self.num_components
+
+    def union_many(self, ps, qs, min_components=1):
+        """
+        Unions the pairs (ps[i], qs[i]) in order, stopping once min_components components remain,
+        and returns the positions i of the pairs that merged two components. The number of pairs
+        looked at before stopping is left in last_scanned.
+        """
+        assert len(ps) == len(qs)
+        self._check(ps)
+        self._check(qs)
+
+        elements, ranks = self.elements, self.ranks
+        num_components = self.num_components
+        merged = []
+        scanned = len(ps)
+        for i in range(len(ps)):
+            if num_components <= min_components:
+                scanned = i
+                break
+
+            # both finds are inlined, a method call per element costs as much as the find itself
+            p = ps[i]
+            parent = elements[p]
+            while parent != p:
+                grandparent = elements[parent]
+                elements[p] = grandparent
+                p, parent = grandparent, elements[grandparent]
+
+            q = qs[i]
+            parent = elements[q]
+            while parent != q:
+                grandparent = elements[parent]
+                elements[q] = grandparent
+                q, parent = grandparent, elements[grandparent]
+
+            if p != q:
+                if ranks[p] < ranks[q]:
+                    elements[p] = q
+                elif ranks[q] < ranks[p]:
+                    elements[q] = p
+                else:
+                    elements[q] = p
+                    ranks[p] += 1
+                num_components -= 1
+                merged.append(i)
+
+        self.num_components = num_components
+        self.last_scanned = scanned
+        return merged
+
+    def find_many(self, ps):
+        """
+        Returns the roots of the elements ps, as a NumPy array if ps is one and as an array('i')
+        otherwise.
+        """
+        if numpy is not None and isinstance(ps, numpy.ndarray):
+            return self._find_many_numpy(ps)
+
+        self._check(ps)
+        find = self.find
+        return array('i', [find(p) for p in ps])
+
+    def _find_many_numpy(self, ps):
+        self._check(ps)
+        elements = numpy.frombuffer(self.elements, dtype=numpy.int32)
+
+        # every step replaces each element by its parent until all of them are roots
+        roots = elements[ps]
+        while True:
+            parents = elements[roots]
+            if numpy.array_equal(parents, roots):
+                break
+            roots = parents
+
+        # the queried elements now point straight at their roots
+        elements[ps] = roots
+        return roots
+
+    def memory_usage(self):
+        return self.elements.itemsize * len(self.elements) + self.ranks.itemsize * len(self.ranks)
+
+
+class RollbackUnionFind(UnionFind):
+    """
+    A union-find by rank without path compression whose unions can be rolled back. The batch
+    operations are inherited from UnionFind and go through find and union below.
+
+        uf = RollbackUnionFind(n)
+        mark = uf.snapshot()
+        uf.union(p, q)
+        uf.rollback(mark)
+    """
+
+    def __init__(self, max_elements):
+        UnionFind.__init__(self, max_elements)
+
+        # one (child root, parent root, whether the rank of the parent grew) entry per union
+        self.history = []
+
+    def find(self, p):
+        assert 0 <= p < self.N
+
+        elements = self.elements
+        while elements[p] != p:
+            p = elements[p]
+        return p
+
+    def union(self, p, q):
+        """
+        Connects p and q and returns whether they were in different components.
+        """
+        p_root = self.find(p)
+        q_root = self.find(q)
+        if p_root == q_root:
+            return False
+
+        if self.ranks[p_root] < self.ranks[q_root]:
+            p_root, q_root = q_root, p_root
+
+        grew = self.ranks[p_root] == self.ranks[q_root]
+        self.elements[q_root] = p_root
+        if grew:
+            self.ranks[p_root] += 1
+        self.history.append((q_root, p_root, grew))
+        self.num_components -= 1
+        return True
+
+    def snapshot(self):
+        return len(self.history)
+
+    def rollback(self, to):
+        """
+        Undoes the unions made after the snapshot to, the most recent first.
+        """
+        assert 0 <= to <= len(self.history)
+        while len(self.history) > to:
+            child, parent, grew = self.history.pop()
+            self.elements[child] = child
+            if grew:
+                self.ranks[parent] -= 1
+            self.num_components += 1
+
+
+class KeyedUnionFind:
+    """
+    A growable union-find over arbitrary hashable keys, with component sizes.
+
+        uf = KeyedUnionFind()
+        uf.union("alice@a.com", "alice@b.com")
+        uf.component_size("alice@a.com")
+        uf.top_components(10)
+    """
+
+    def __init__(self):
+        # maps from keys to ids and back
+        self.ids = {}
+        self.keys = []
+
+        self.elements = []
+        self.sizes = []
+        self.num_components = 0
+
+        # the roots of each component size and the size of the largest component
+        self.roots_of_size = {}
+        self.max_size = 0
+
+    def add(self, key):
+        """
+        Interns the key as a singleton component if it is new and returns its id.
+        """
+        i = self.ids.get(key)
+        if i is None:
+            i = len(self.keys)
+            self.ids[key] = i
+            self.keys.append(key)
+            self.elements.append(i)
+            self.sizes.append(1)
+            self.num_components += 1
+            self._add_root(i, 1)
+        return i
+
+    def _add_root(self, root, size):
+        roots = self.roots_of_size.get(size)
+        if roots is None:
+            roots = self.roots_of_size[size] = set()
+        roots.add(root)
+        if size > self.max_size:
+            self.max_size = size
+
+    def _remove_root(self, root, size):
+        roots = self.roots_of_size[size]
+        roots.discard(root)
+        if not roots:
+            del self.roots_of_size[size]
+
+    def _find(self, i):
+        elements = self.elements
+        while elements[i] != i:
+            elements[i] = elements[elements[i]]
+            i = elements[i]
+        return i
+
+    def _root_of(self, key):
+        """
+        Returns the id of the root of the component of key, or None if the key is unknown.
+        """
+        i = self.ids.get(key)
+        return self._find(i) if i is not None else None
+
+    def find(self, key):
+        """
+        Returns the representative key of the component of key. An unknown key is not interned and
+        is its own representative.
+        """
+        root = self._root_of(key)
+        return self.keys[root] if root is not None else key
+
+    def union(self, p, q):
+        """
+        Connects the keys p and q, interning them if needed, and returns whether they were in
+        different components.
+        """
+        p_root = self._find(self.add(p))
+        q_root = self._find(self.add(q))
+        if p_root == q_root:
+            return False
+
+        sizes = self.sizes
+        if sizes[p_root] < sizes[q_root]:
+            p_root, q_root = q_root, p_root
+
+        self._remove_root(p_root, sizes[p_root])
+        self._remove_root(q_root, sizes[q_root])
+        self.elements[q_root] = p_root
+        sizes[p_root] += sizes[q_root]
+        self._add_root(p_root, sizes[p_root])
+
+        self.num_components -= 1
+        return True
+
+    def connected(self, p, q):
+        p_root = self._root_of(p)
+        q_root = self._root_of(q)
+        if p_root is None or q_root is None:
+            return p == q
+        return p_root == q_root
+
+    def count_components(self):
+        return self.num_components
+
+    def num_keys(self):
+        return len(self.keys)
+
+    def component_size(self, key):
+        root = self._root_of(key)
+        return self.sizes[root] if root is not None else 1
+
+    def largest_component(self):
+        """
+        Returns the (representative key, size) pair of a largest component, or None if there
+        are no keys.
+        """
+        if self.max_size == 0:
+            return None
+        return self.keys[next(iter(self.roots_of_size[self.max_size]))], self.max_size
+
+    def distinct_sizes(self):
+        """
+        Returns the distinct component sizes in ascending order.
+        """
+        return sorted(self.roots_of_size)
+
+    def top_components(self, k):
+        """
+        Returns the (representative key, size) pairs of the k largest components, largest first.
+        """
+        top = []
+        for size in sorted(self.roots_of_size, reverse=True):
+            for root in self.roots_of_size[size]:
+                if len(top) == k:
+                    return top
+                top.append((self.keys[root], size))
+        return top
+
+
 if __name__ == "__main__":
 
     N = 100000
@@ -131,3 +519,120 @@ if __name__ == "__main__":
             uf.union(p, q)
 
     print uf.count_components(), ' connected components'
+
+    with open('../data/mediumUF.txt', 'r') as input_file:
+        N = int(input_file.readline())
+        pairs = [[int(x) for x in ln.split()] for ln in input_file.readlines()]
+
+    auf = ArrayUnionFind(N)
+    merged = auf.union_many([p for (p, _) in pairs], [q for (_, q) in pairs])
+    assert auf.count_components() == uf.count_components() == N - len(merged)
+    assert auf.last_scanned == len(pairs)
+    roots = auf.find_many(range(N))
+    assert all((roots[p] == roots[q]) == uf.connected(p, q) for (p, q) in pairs[:1000])
+
+    ruf = RollbackUnionFind(N)
+    ruf.union_many([p for (p, _) in pairs[:300]], [q for (_, q) in pairs[:300]])
+    components = ruf.count_components()
+    roots = ruf.find_many(range(N))
+    mark = ruf.snapshot()
+    ruf.union_many([p for (p, _) in pairs[300:]], [q for (_, q) in pairs[300:]])
+    assert ruf.count_components() == auf.count_components()
+    ruf.rollback(mark)
+    assert ruf.count_components() == components and ruf.find_many(range(N)) == roots
+    ruf.rollback(0)
+    assert ruf.count_components() == N and ruf.snapshot() == 0
+
+    kuf = KeyedUnionFind()
+    assert kuf.largest_component() is None and kuf.top_components(3) == []
+    for (p, q) in pairs:
+        kuf.union('id-%d' % p, 'id-%d' % q)
+    # the elements that never appear in a pair are unknown to the keyed union-find
+    assert kuf.count_components() + N - kuf.num_keys() == uf.count_components()
+    sizes = {}
+    for p in range(N):
+        if 'id-%d' % p in kuf.ids:
+            root = kuf.find('id-%d' % p)
+            sizes[root] = sizes.get(root, 0) + 1
+    assert sorted(sizes.values(), reverse=True)[:2] == [size for (_, size) in kuf.top_components(2)]
+    assert kuf.largest_component()[1] == max(sizes.values())
+    assert kuf.distinct_sizes() == sorted(set(sizes.values()))
+    assert all(kuf.component_size(key) == size for (key, size) in sizes.items())
+
+    # the queries do not intern unknown keys, only union and add do
+    components, num_keys = kuf.count_components(), kuf.num_keys()
+    assert not kuf.connected('id-0', 'unknown') and kuf.connected('unknown', 'unknown')
+    assert kuf.component_size('unknown') == 1 and kuf.find('unknown') == 'unknown'
+    assert kuf.count_components() == components and kuf.num_keys() == num_keys
+
+    # a union-find the size of the largest clustering input, with a few million random unions
+    import random
+    import sys
+    import timeit
+
+    N = 875714
+    rnd = random.Random(1)
+    ps = array('i', [rnd.randrange(N) for _ in range(2000000)])
+    qs = array('i', [rnd.randrange(N) for _ in range(2000000)])
+
+    start = timeit.default_timer()
+    uf = UnionFind(N)
+    for i in range(len(ps)):
+        uf.union(ps[i], qs[i])
+    list_time = timeit.default_timer() - start
+    list_memory = sys.getsizeof(uf.elements) + sys.getsizeof(uf.ranks) + \
+        sum(sys.getsizeof(x) for x in uf.elements if x > 256)
+
+    start = timeit.default_timer()
+    auf = ArrayUnionFind(N)
+    auf.union_many(ps, qs)
+    array_time = timeit.default_timer() - start
+
+    assert auf.count_components() == uf.count_components()
+    print('%d elements, %d unions: UnionFind %.2fs %.1fMB, ArrayUnionFind %.2fs %.1fMB'
+          % (N, len(ps), list_time, list_memory / 1e6, array_time, auf.memory_usage() / 1e6))
+
+    # what-if experiments of a few unions each on top of a large state, copied or rolled back
+    import copy
+
+    base = RollbackUnionFind(N)
+    base.union_many(ps[:500000], qs[:500000])
+    experiments = [(rnd.randrange(N), rnd.randrange(N)) for _ in range(10 * 100)]
+
+    start = timeit.default_timer()
+    copied = []
+    for e in range(0, len(experiments), 10):
+        trial = copy.copy(base)
+        trial.elements, trial.ranks, trial.history = base.elements[:], base.ranks[:], []
+        for (p, q) in experiments[e:e + 10]:
+            trial.union(p, q)
+        copied.append(trial.count_components())
+    copy_time = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    rolled_back = []
+    mark = base.snapshot()
+    for e in range(0, len(experiments), 10):
+        for (p, q) in experiments[e:e + 10]:
+            base.union(p, q)
+        rolled_back.append(base.count_components())
+        base.rollback(mark)
+    rollback_time = timeit.default_timer() - start
+
+    assert copied == rolled_back
+    print('100 what-if experiments of 10 unions: %.3fs copying, %.3fs rolling back' % (copy_time, rollback_time))
+
+    # a stream of string ids of unknown cardinality
+    start = timeit.default_timer()
+    kuf = KeyedUnionFind()
+    for i in range(len(ps) // 4):
+        kuf.union('user-%d' % ps[i], 'user-%d' % qs[i])
+    stream_time = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    for _ in range(1000):
+        top = kuf.top_components(10)
+    top_time = timeit.default_timer() - start
+    print('%d string ids, %d unions: %.2fs, largest component %d, top 10 in %.3f ms, %d distinct sizes'
+          % (kuf.num_keys(), len(ps) // 4, stream_time, kuf.largest_component()[1], top_time,
+             len(kuf.distinct_sizes())))